@@ -0,0 +1,204 @@
+"""Alertas sonoras fuera del bucle de frames.
+
+El detector solo llama ``AlertEngine.trigger()``, que encola un comando y
+regresa de inmediato. Un hilo dedicado aplica el limite de frecuencia y
+reproduce el sonido con el backend elegido, midiendo la latencia entre la
+decision de alertar y el inicio del sonido. Mientras un sonido esta en curso
+los disparos se descartan: un alarma.mp3 mas largo que ``min_interval`` no
+deja sonidos en fila que sigan sonando con los ojos ya abiertos.
+"""
+import queue
+import sys
+import threading
+from collections import deque
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from instrumentacion import now
+
+ALERT_SOUND = Path(__file__).with_name("alarma.mp3")
+ALERT_MIN_INTERVAL = 0.25  # Segundos minimos entre dos sonidos
+BEEP_FREQUENCY = 1000
+BEEP_DURATION_MS = 100
+TTY_DEVICE = "/dev/tty"  # Terminal de control, para la campana fuera de Windows
+LATENCY_WINDOW = 128  # Latencias recientes usadas para los percentiles
+
+
+class NullBackend:
+    """No emite sonido; util en servidores Linux y procesamiento sin pantalla."""
+
+    name = "null"
+
+    def play(self) -> None:
+        pass
+
+
+class RecordingBackend:
+    """Guarda el instante de cada sonido en lugar de reproducirlo (pruebas)."""
+
+    name = "recording"
+
+    def __init__(self) -> None:
+        self.played: List[float] = []
+
+    def play(self) -> None:
+        self.played.append(now())
+
+
+class BeepBackend:
+    """Pitido del sistema: winsound en Windows, campana de la terminal de control en otros.
+
+    La campana va a ``/dev/tty`` y nunca a stderr: bajo el panel stderr es un
+    pipe con protocolo por lineas (``[SERVICE]``, ``[CONTROL]``) y el ``\\a``
+    quedaria pegado al inicio de la siguiente linea sin que nadie lo escuche.
+    Sin terminal de control el pitido no suena; se avisa una vez.
+    """
+
+    name = "beep"
+
+    def __init__(self, frequency: int = BEEP_FREQUENCY, duration_ms: int = BEEP_DURATION_MS) -> None:
+        self.frequency = frequency
+        self.duration_ms = duration_ms
+        try:
+            import winsound
+        except ImportError:
+            winsound = None
+        self._winsound = winsound
+        self._tty = None
+        if winsound is None:
+            try:
+                self._tty = open(TTY_DEVICE, "w")
+            except OSError:
+                print("[WARN] Sin winsound ni terminal de control: la alerta sonora no se escuchara",
+                      file=sys.stderr, flush=True)
+
+    def play(self) -> None:
+        if self._winsound is not None:
+            self._winsound.Beep(self.frequency, self.duration_ms)
+        elif self._tty is not None:
+            self._tty.write("\a")
+            self._tty.flush()
+
+
+class SoundFileBackend:
+    """Reproduce alarma.mp3 con playsound (dependencia opcional)."""
+
+    name = "file"
+
+    def __init__(self, path: Path = ALERT_SOUND) -> None:
+        from playsound import playsound  # ImportError si no esta instalado
+        if not Path(path).exists():
+            raise FileNotFoundError(path)
+        self.path = str(path)
+        self._playsound = playsound
+
+    def play(self) -> None:
+        self._playsound(self.path, block=True)
+
+
+BACKENDS = {
+    "null": NullBackend,
+    "recording": RecordingBackend,
+    "beep": BeepBackend,
+    "file": SoundFileBackend,
+}
+
+
+def create_backend(name: str = "auto"):
+    """Construye el backend pedido; ``auto`` prefiere alarma.mp3 y cae al pitido."""
+    if name != "auto":
+        return BACKENDS[name]()
+    try:
+        return SoundFileBackend()
+    except (ImportError, OSError):
+        return BeepBackend()
+
+
+class AlertEngine:
+    """Hilo de alertas con cola de comandos y limite de frecuencia."""
+
+    def __init__(self, backend=None, min_interval: float = ALERT_MIN_INTERVAL) -> None:
+        self.backend = backend if backend is not None else NullBackend()
+        self.min_interval = float(min_interval)
+        self._queue: "queue.Queue[Optional[float]]" = queue.Queue(maxsize=1)  # A lo sumo un disparo pendiente
+        self._playing = threading.Event()  # El hilo esta reproduciendo un sonido
+        self._thread: Optional[threading.Thread] = None
+        self._last_accepted = float("-inf")
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self.played = 0
+        self.suppressed = 0  # Disparos ignorados: limite de frecuencia, sonido en curso o cola llena
+        self.errors = 0
+
+    def start(self) -> "AlertEngine":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="AlertEngine", daemon=True)
+            self._thread.start()
+        return self
+
+    def trigger(self, decision_time: Optional[float] = None) -> bool:
+        """Pide un sonido sin bloquear; devuelve False si se descarto."""
+        decision_time = now() if decision_time is None else decision_time
+        if self._playing.is_set() or decision_time - self._last_accepted < self.min_interval:
+            self.suppressed += 1
+            return False
+        try:
+            self._queue.put_nowait(decision_time)
+        except queue.Full:
+            self.suppressed += 1
+            return False
+        self._last_accepted = decision_time
+        return True
+
+    def _run(self) -> None:
+        while True:
+            decision_time = self._queue.get()
+            if decision_time is None:
+                break
+            self._playing.set()
+            started = now()
+            self._latencies.append(started - decision_time)
+            try:
+                self.backend.play()
+                self.played += 1
+            except Exception as exc:
+                self.errors += 1
+                print(f"[WARN] No se pudo reproducir la alerta: {exc}", file=sys.stderr)
+            finally:
+                # Lo que alcanzo a encolarse mientras sonaba ya es viejo
+                stop = self._discard_pending()
+                self._playing.clear()
+            if stop:
+                break
+
+    def _discard_pending(self) -> bool:
+        """Descarta los disparos pendientes; True si entre ellos venia la orden de terminar."""
+        while True:
+            try:
+                pending = self._queue.get_nowait()
+            except queue.Empty:
+                return False
+            if pending is None:
+                return True
+            self.suppressed += 1
+
+    def latency_stats(self) -> Tuple[float, float]:
+        """(p50, p95) en ms entre la decision de alertar y el inicio del sonido."""
+        if not self._latencies:
+            return 0.0, 0.0
+        p50, p95 = np.percentile(list(self._latencies), [50, 95]) * 1000.0
+        return float(p50), float(p95)
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        # Se descartan los pendientes y se despierta al hilo para que termine
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+        self._queue.put(None)
+        self._thread.join(timeout=2.0)
+        self._thread = None
@@ -0,0 +1,301 @@
+"""Barrido de umbrales sobre trazas de EAR ya grabadas, sin volver a correr MediaPipe.
+
+Ejemplo:
+    python barrido.py resultados/ sesiones/turno1 --labels etiquetas.json --output barrido.csv
+
+Las trazas salen de procesar_videos.py (``.npz``) o de ``angulo.py --record``
+(carpetas de sesion). Se evalua la rejilla completa de ``ear_dynamic_ratio``,
+``frame_threshold``, ``EAR_BASELINE_ALPHA`` y ``EAR_BASELINE_GUARD_RATIO``:
+
+* La linea base se repite una vez por par (alpha, guard) con la misma logica
+  del detector; es el unico paso secuencial.
+* Con cada linea base, los ojos cerrados de todos los ratios salen de una sola
+  comparacion (ratios, T) y las rachas se miden con mascaras de inicio y fin.
+* Un histograma de longitudes de racha da las alertas de todos los
+  ``frame_threshold`` a la vez: cada racha que llega a N frames es una alerta.
+
+Con ``--labels`` (JSON ``{"traza": [[inicio_s, fin_s], ...]}``) tambien se
+reportan los episodios de somnolencia detectados, la latencia hasta la
+alerta y las alertas fuera de los episodios (falsas). Los segundos son los
+del video (``timestamp_ms``) o desde el primer registro de la sesion.
+"""
+import argparse
+import csv
+import json
+import math
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+from control_estado import build_settings
+from estadisticas import SlidingMedian
+from grabador import META_FILE, open_session
+from umbrales import (
+    BASELINE_WINDOW_FRAMES,
+    CALIBRATION_FRAMES,
+    EAR_BASELINE_ALPHA,
+    EAR_BASELINE_GUARD_RATIO,
+    EAR_MIN_MARGIN,
+    MIN_DYNAMIC_EAR,
+)
+
+DEFAULT_RATIOS = "0.70:0.95:0.01"
+DEFAULT_FRAME_THRESHOLDS = "5:120:1"
+DEFAULT_ALPHAS = "0.02,0.04,0.06,0.1"
+DEFAULT_GUARDS = "0.8,0.85,0.9"
+
+
+class Trace(NamedTuple):
+    """EAR suavizado de un ocupante, solo en los frames con rostro."""
+    name: str
+    ear: np.ndarray  # ear_smoothed por frame analizado
+    timestamp: np.ndarray  # Segundos
+    restart: np.ndarray  # True donde el contador de frames cerrados vuelve a cero (rostro perdido antes)
+
+
+class SweepResult(NamedTuple):
+    """Totales por configuracion; cada arreglo tiene forma (alphas, guards, ratios, frame_thresholds)."""
+    alerts: np.ndarray
+    false_alerts: np.ndarray  # Solo con etiquetas
+    detected: np.ndarray  # Episodios etiquetados con al menos una alerta
+    latency_sum: np.ndarray  # Suma de segundos desde el inicio del episodio hasta la primera alerta
+    hours: float
+    episodes: int
+
+
+def parse_grid(text: str) -> np.ndarray:
+    """``"inicio:fin:paso"`` (fin incluido) o una lista ``"a,b,c"``."""
+    if ":" in text:
+        start, stop, step = (float(part) for part in text.split(":"))
+        return np.round(np.arange(start, stop + step / 2, step), 6)
+    return np.array([float(part) for part in text.split(",")])
+
+
+def _restarts(frames: np.ndarray) -> np.ndarray:
+    # El contador del detector avanza una vez por frame analizado: un salto es un frame sin este rostro
+    return np.diff(frames.astype(np.int64), prepend=-1) != 1
+
+
+def load_traces(path: Path) -> List[Trace]:
+    """Trazas de un ``.npz`` de procesar_videos.py o de una carpeta de sesion (una por ``face_id``)."""
+    if path.is_dir():
+        session = open_session(path)
+        metrics = session.metrics
+        face_ids = np.unique(metrics["face_id"])
+        traces = []
+        for face_id in face_ids.tolist():
+            rows = np.flatnonzero(metrics["face_id"] == face_id)
+            name = path.name if len(face_ids) == 1 else f"{path.name}#{face_id}"
+            traces.append(Trace(
+                name,
+                metrics["ear_smoothed"][rows].astype(np.float64),
+                session.frames["timestamp"][rows].astype(np.float64),
+                _restarts(metrics["frame"][rows]),
+            ))
+        return traces
+    data = np.load(path)
+    found = data["face_found"]
+    return [Trace(
+        path.stem,
+        data["ear_smoothed"][found].astype(np.float64),
+        data["timestamp_ms"][found] / 1000.0,
+        _restarts(data["frame"][found]),
+    )]
+
+
+def collect_traces(inputs: List[Path]) -> List[Trace]:
+    traces = []
+    for source in inputs:
+        if (source / META_FILE).exists() or source.suffix == ".npz":
+            paths = [source]
+        elif source.is_dir():
+            paths = sorted(source.rglob("*.npz")) + sorted(meta.parent for meta in source.rglob(META_FILE))
+        else:
+            print(f"[WARN] No existe {source}", file=sys.stderr)
+            continue
+        for path in paths:
+            traces.extend(trace for trace in load_traces(path) if len(trace.ear))
+    return traces
+
+
+def replay_baseline(ear: np.ndarray, alpha: float, guard: float) -> np.ndarray:
+    """Linea base frame a frame igual que ``DrowsinessDetector._update_faces``; NaN mientras calibra."""
+    median = SlidingMedian(BASELINE_WINDOW_FRAMES)
+    push = median.push
+    current = math.nan
+    baseline = []
+    for value in ear.tolist():
+        if current != current:  # Calibrando: se aceptan todas las muestras
+            target = push(value)
+            if len(median) >= CALIBRATION_FRAMES:
+                current = target
+        elif value >= current * guard:
+            current = current * (1 - alpha) + push(value) * alpha
+        baseline.append(current)
+    return np.array(baseline)
+
+
+def closed_runs(trace: Trace, baseline: np.ndarray, ratios: np.ndarray):
+    """Rachas de ojos cerrados para todos los ratios: fila (ratio), posicion de inicio y longitud."""
+    calibrated = ~np.isnan(baseline)
+    base = np.where(calibrated, baseline, 0.0)
+    drop = np.maximum(EAR_MIN_MARGIN, base * (1 - ratios[:, None]))
+    threshold = np.maximum(MIN_DYNAMIC_EAR, base - drop)
+    closed = calibrated & (trace.ear < threshold)  # (R, T)
+
+    previous = np.zeros_like(closed)
+    previous[:, 1:] = closed[:, :-1]
+    following = np.zeros_like(closed)
+    following[:, :-1] = closed[:, 1:]
+    next_restart = np.append(trace.restart[1:], True)
+    # El ultimo frame de cada fila siempre cierra la racha, asi los inicios y fines quedan pareados
+    starts = np.flatnonzero(closed & (~previous | trace.restart))
+    ends = np.flatnonzero(closed & (~following | next_restart))
+    length = closed.shape[1]
+    return starts // length, starts % length, ends - starts + 1
+
+
+def sweep(traces: List[Trace], ratios: np.ndarray, frame_thresholds: np.ndarray, alphas: np.ndarray,
+          guards: np.ndarray, labels: Optional[Dict[str, list]] = None) -> SweepResult:
+    ratios = np.asarray(ratios, dtype=np.float64)
+    frame_thresholds = np.asarray(frame_thresholds, dtype=np.int64)
+    shape = (len(alphas), len(guards), len(ratios), len(frame_thresholds))
+    alerts = np.zeros(shape, dtype=np.int64)
+    false_alerts = np.zeros(shape, dtype=np.int64)
+    detected = np.zeros(shape, dtype=np.int64)
+    latency_sum = np.zeros(shape)
+    max_threshold = int(frame_thresholds.max())
+    hours = 0.0
+    episodes = 0
+
+    for trace in traces:
+        hours += (trace.timestamp[-1] - trace.timestamp[0]) / 3600.0
+        intervals = np.asarray((labels or {}).get(trace.name, []), dtype=np.float64).reshape(-1, 2)
+        intervals = intervals[np.argsort(intervals[:, 0])]
+        episodes += len(intervals)
+        for a, alpha in enumerate(alphas):
+            for g, guard in enumerate(guards):
+                baseline = replay_baseline(trace.ear, alpha, guard)
+                rows, positions, lengths = closed_runs(trace, baseline, ratios)
+
+                # at_least[r, n] = rachas del ratio r con n frames o mas
+                bins = max_threshold + 1
+                histogram = np.bincount(rows * bins + np.minimum(lengths, max_threshold),
+                                        minlength=len(ratios) * bins).reshape(len(ratios), bins)
+                at_least = histogram[:, ::-1].cumsum(axis=1)[:, ::-1]
+                alerts[a, g] += at_least[:, frame_thresholds]
+                if labels is None:
+                    continue
+
+                keep = lengths >= frame_thresholds.min()
+                rows, positions, lengths = rows[keep], positions[keep], lengths[keep]
+                fires = lengths[:, None] >= frame_thresholds  # (rachas, F)
+                onset = np.minimum(positions[:, None] + frame_thresholds - 1, len(trace.ear) - 1)
+                onset_time = trace.timestamp[onset]
+                episode = np.searchsorted(intervals[:, 0], onset_time, side="right") - 1
+                inside = fires & (episode >= 0)
+                if len(intervals):
+                    inside &= onset_time <= intervals[np.maximum(episode, 0), 1]
+                np.add.at(false_alerts[a, g], rows, fires & ~inside)
+
+                first = np.full((len(ratios), len(intervals), len(frame_thresholds)), np.inf)
+                run, column = np.nonzero(inside)
+                np.minimum.at(first, (rows[run], episode[run, column], column), onset_time[run, column])
+                found = np.isfinite(first)
+                detected[a, g] += found.sum(axis=1)
+                latency_sum[a, g] += np.where(found, first - intervals[None, :, 0, None], 0.0).sum(axis=1)
+
+    return SweepResult(alerts, false_alerts, detected, latency_sum, hours, episodes)
+
+
+def result_rows(result: SweepResult, ratios, frame_thresholds, alphas, guards, labeled: bool) -> List[dict]:
+    rows = []
+    hours = max(result.hours, 1e-9)
+    for index in np.ndindex(result.alerts.shape):
+        a, g, r, f = index
+        row = {
+            "alpha": float(alphas[a]),
+            "guard": float(guards[g]),
+            "ear_dynamic_ratio": float(ratios[r]),
+            "frame_threshold": int(frame_thresholds[f]),
+            "alerts": int(result.alerts[index]),
+            "alerts_per_hour": result.alerts[index] / hours,
+        }
+        if labeled:
+            detected = int(result.detected[index])
+            row.update({
+                "detected": detected,
+                "episodes": result.episodes,
+                "mean_latency_s": result.latency_sum[index] / detected if detected else float("nan"),
+                "false_alerts": int(result.false_alerts[index]),
+                "false_per_hour": result.false_alerts[index] / hours,
+            })
+        rows.append(row)
+    return rows
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Evalua una rejilla de umbrales sobre trazas de EAR grabadas.")
+    parser.add_argument("inputs", nargs="+", type=Path, help="Archivos .npz, carpetas de sesion o carpetas que los contengan")
+    parser.add_argument("--ratios", default=DEFAULT_RATIOS, help="Valores de ear_dynamic_ratio")
+    parser.add_argument("--frame-thresholds", default=DEFAULT_FRAME_THRESHOLDS, help="Valores de frame_threshold")
+    parser.add_argument("--alphas", default=DEFAULT_ALPHAS, help="Valores de EAR_BASELINE_ALPHA")
+    parser.add_argument("--guards", default=DEFAULT_GUARDS, help="Valores de EAR_BASELINE_GUARD_RATIO")
+    parser.add_argument("--labels", type=Path, default=None, help="JSON con los episodios de somnolencia por traza")
+    parser.add_argument("--control", type=Path, default=None, help="Archivo de control con los ajustes actuales")
+    parser.add_argument("--output", "-o", type=Path, default=None, help="CSV con todas las configuraciones")
+    parser.add_argument("--top", type=int, default=10, help="Configuraciones a mostrar")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    ratios = parse_grid(args.ratios)
+    frame_thresholds = parse_grid(args.frame_thresholds).astype(np.int64)
+    alphas = parse_grid(args.alphas)
+    guards = parse_grid(args.guards)
+    labels = json.loads(args.labels.read_text()) if args.labels else None
+
+    traces = collect_traces(args.inputs)
+    if not traces:
+        print("[WARN] No se encontraron trazas", file=sys.stderr)
+        return 1
+
+    started = time.perf_counter()
+    result = sweep(traces, ratios, frame_thresholds, alphas, guards, labels)
+    elapsed = time.perf_counter() - started
+    print(f"[INFO] {result.alerts.size} configuraciones, {len(traces)} trazas, {result.hours:.2f} h "
+          f"en {elapsed:.1f}s", file=sys.stderr)
+
+    rows = result_rows(result, ratios, frame_thresholds, alphas, guards, labels is not None)
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, "w", newline="") as handle:
+            writer = csv.DictWriter(handle, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+
+    settings = build_settings(args.control, None, None)
+    current = [
+        row for row in rows
+        if math.isclose(row["alpha"], EAR_BASELINE_ALPHA) and math.isclose(row["guard"], EAR_BASELINE_GUARD_RATIO)
+        and math.isclose(row["ear_dynamic_ratio"], settings.ear_dynamic_ratio)
+        and row["frame_threshold"] == settings.frame_threshold
+    ]
+    if labels is not None:
+        # Primero los que detectan mas episodios, luego los de menos falsas alarmas y menor latencia
+        rows.sort(key=lambda row: (-row["detected"], row["false_alerts"],
+                                   row["mean_latency_s"] if row["detected"] else math.inf))
+        print("Mejores configuraciones:")
+        for row in rows[:args.top]:
+            print("  " + ", ".join(f"{key}={value:.3g}" for key, value in row.items()))
+    for row in current:
+        print("Ajustes actuales: " + ", ".join(f"{key}={value:.3g}" for key, value in row.items()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
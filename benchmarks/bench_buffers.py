@@ -0,0 +1,105 @@
+"""Micro-benchmark de las copias de frame por iteracion: arreglos nuevos vs BufferPool.
+
+Uso: python benchmarks/bench_buffers.py [--frames 500] [--size 1040]
+
+Repite las etapas que tocan el frame completo en angulo.py (lectura,
+cvtColor, recorte reducido para FaceMesh y espejo de la vista) con y sin
+``dst`` preasignado. ``tracemalloc`` cuenta los bytes que reserva cada
+variante por frame; OpenCV reserva sus salidas como arreglos de NumPy, asi
+que tambien aparecen ahi. No necesita camara ni MediaPipe.
+"""
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from inferencia import INFERENCE_SIZE  # noqa: E402
+from memoria import BufferPool  # noqa: E402
+
+
+def synthetic_frames(size: int, count: int = 4, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    return [rng.integers(0, 255, size=(size, size, 3), dtype=np.uint8) for _ in range(count)]
+
+
+def roi_for(index: int, size: int):
+    # El recorte se mueve y cambia de tamaño como cuando el rostro se acerca o se aleja
+    side = size // 2 + (index % 7) * 8
+    x0 = (index * 5) % (size - side)
+    return x0, size // 4, x0 + side, size // 4 + side
+
+
+def allocating_frame(source: np.ndarray, index: int, size: int) -> None:
+    frame = source.copy()  # Lo que hace cap.read() sin destino
+    rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    x0, y0, x1, y1 = roi_for(index, size)
+    scale = INFERENCE_SIZE / (x1 - x0)
+    cv2.resize(rgb[y0:y1, x0:x1], (round((x1 - x0) * scale), round((y1 - y0) * scale)),
+               interpolation=cv2.INTER_AREA)
+    cv2.flip(frame, 1)
+
+
+def pooled_frame(source: np.ndarray, index: int, size: int, pool: BufferPool) -> None:
+    frame = pool.take("frame", source.shape)
+    np.copyto(frame, source)  # Lo que hace cap.read(dst)
+    dst = pool.take("rgb", frame.shape)
+    rgb = pool.confirm("rgb", dst, cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=dst))
+    x0, y0, x1, y1 = roi_for(index, size)
+    scale = INFERENCE_SIZE / (x1 - x0)
+    shape = (round((y1 - y0) * scale), round((x1 - x0) * scale), 3)
+    dst = pool.take("roi", shape)
+    pool.confirm("roi", dst, cv2.resize(rgb[y0:y1, x0:x1], (shape[1], shape[0]), dst=dst,
+                                        interpolation=cv2.INTER_AREA))
+    dst = pool.take("display", frame.shape)
+    pool.confirm("display", dst, cv2.flip(frame, 1, dst=dst))
+
+
+def measure(step, sources, frames: int):
+    """Tiempo por frame y bytes reservados por frame, despues de un frame de calentamiento."""
+    step(sources[0], 0)
+    started = time.perf_counter()
+    for index in range(1, frames + 1):
+        step(sources[index % len(sources)], index)
+    elapsed = time.perf_counter() - started
+
+    # Segunda pasada con tracemalloc, que agrega su propio costo y no entra en el tiempo
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    allocated = 0
+    for index in range(1, frames + 1):
+        tracemalloc.reset_peak()
+        step(sources[index % len(sources)], index)
+        current, peak = tracemalloc.get_traced_memory()
+        allocated += max(0, peak - before)
+        before = current
+    tracemalloc.stop()
+    return elapsed / frames * 1000.0, allocated / frames
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=500)
+    parser.add_argument("--size", type=int, default=1040, help="Lado del frame cuadrado")
+    args = parser.parse_args(argv)
+
+    sources = synthetic_frames(args.size)
+    pool = BufferPool()
+    variants = (
+        ("sin pool", lambda source, index: allocating_frame(source, index, args.size)),
+        ("con pool", lambda source, index: pooled_frame(source, index, args.size, pool)),
+    )
+    for name, step in variants:
+        ms, allocated = measure(step, sources, args.frames)
+        print(f"{name:9s}: {ms:6.2f} ms/frame, {allocated / 1e6:6.2f} MB reservados/frame")
+    print(f"reservas del pool: {pool.allocations} en {pool.requests} pedidos")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
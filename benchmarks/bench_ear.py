@@ -0,0 +1,120 @@
+"""Micro-benchmark del calculo de EAR por frame: version previa vs vectorizada.
+
+Uso: python benchmarks/bench_ear.py [--frames 20000]
+No necesita camara ni MediaPipe; usa landmarks sinteticos con la misma forma
+que ``face_landmarks.landmark``.
+"""
+import argparse
+import sys
+import timeit
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from geometria_ojos import (  # noqa: E402
+    EYE_LANDMARKS,
+    LEFT_EYE_HORIZONTAL_PAIR,
+    LEFT_EYE_VERTICAL_PAIRS,
+    NUM_LANDMARKS,
+    RIGHT_EYE_HORIZONTAL_PAIR,
+    RIGHT_EYE_VERTICAL_PAIRS,
+    eye_metrics,
+    index_left_eye,
+    index_right_eye,
+    landmarks_to_array,
+    new_landmark_buffer,
+)
+
+WIDTH = 1040
+HEIGHT = 1040
+
+
+# Implementacion previa, copiada tal cual de angulo.py como referencia
+def legacy_eye_aspect_ratio(coordinates):
+    d_A = np.linalg.norm(np.array(coordinates[1]) - np.array(coordinates[5]))
+    d_B = np.linalg.norm(np.array(coordinates[2]) - np.array(coordinates[4]))
+    d_C = np.linalg.norm(np.array(coordinates[0]) - np.array(coordinates[3]))
+    return (d_A + d_B) / (2 * d_C)
+
+
+def legacy_landmark_to_point(landmark, width, height):
+    return np.array([landmark.x * width, landmark.y * height, landmark.z * width], dtype=np.float32)
+
+
+def legacy_eye_vertical_ratio(face_landmarks, width, height, vertical_pairs, horizontal_pair):
+    p_start = legacy_landmark_to_point(face_landmarks.landmark[horizontal_pair[0]], width, height)
+    p_end = legacy_landmark_to_point(face_landmarks.landmark[horizontal_pair[1]], width, height)
+    horizontal_dist = np.linalg.norm(p_start - p_end)
+    if horizontal_dist < 1e-5:
+        return 0.0
+    distances = []
+    for top_idx, bottom_idx in vertical_pairs:
+        top_point = legacy_landmark_to_point(face_landmarks.landmark[top_idx], width, height)
+        bottom_point = legacy_landmark_to_point(face_landmarks.landmark[bottom_idx], width, height)
+        distances.append(np.linalg.norm(top_point - bottom_point))
+    distances.sort()
+    return float(np.mean(distances[:2])) / horizontal_dist
+
+
+def legacy_frame(face_landmarks):
+    coordinates_left_eye = []
+    coordinates_right_eye = []
+    for index in index_left_eye:
+        landmark = face_landmarks.landmark[index]
+        coordinates_left_eye.append([landmark.x * WIDTH, landmark.y * HEIGHT, landmark.z * WIDTH])
+    for index in index_right_eye:
+        landmark = face_landmarks.landmark[index]
+        coordinates_right_eye.append([landmark.x * WIDTH, landmark.y * HEIGHT, landmark.z * WIDTH])
+    ear_left_eye = legacy_eye_aspect_ratio(coordinates_left_eye)
+    ear_right_eye = legacy_eye_aspect_ratio(coordinates_right_eye)
+    ear_raw = (ear_left_eye + ear_right_eye) / 2
+    vertical_left = legacy_eye_vertical_ratio(face_landmarks, WIDTH, HEIGHT, LEFT_EYE_VERTICAL_PAIRS, LEFT_EYE_HORIZONTAL_PAIR)
+    vertical_right = legacy_eye_vertical_ratio(face_landmarks, WIDTH, HEIGHT, RIGHT_EYE_VERTICAL_PAIRS, RIGHT_EYE_HORIZONTAL_PAIR)
+    ear = (min(ear_left_eye, vertical_left) + min(ear_right_eye, vertical_right)) / 2
+    return ear_raw, ear
+
+
+def vectorized_frame(face_landmarks, buffer):
+    points = landmarks_to_array(face_landmarks.landmark, WIDTH, HEIGHT, buffer, EYE_LANDMARKS)
+    ear_eyes, vertical_eyes = eye_metrics(points)
+    return float(ear_eyes.mean()), float(np.minimum(ear_eyes, vertical_eyes).mean())
+
+
+def synthetic_face(seed: int = 0):
+    """Genera un objeto con ``.landmark`` parecido a la salida de FaceMesh."""
+    rng = np.random.default_rng(seed)
+    coords = rng.uniform(0.3, 0.7, size=(NUM_LANDMARKS, 3))
+    coords[:, 2] -= 0.5
+    landmarks = [SimpleNamespace(x=float(x), y=float(y), z=float(z)) for x, y, z in coords]
+    return SimpleNamespace(landmark=landmarks)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=20000)
+    args = parser.parse_args()
+
+    face = synthetic_face()
+    buffer = new_landmark_buffer()
+
+    legacy = legacy_frame(face)
+    vectorized = vectorized_frame(face, buffer)
+    if not np.allclose(legacy, vectorized, rtol=1e-4):
+        raise SystemExit(f"Resultados distintos: previo={legacy} vectorizado={vectorized}")
+
+    legacy_s = min(timeit.repeat(lambda: legacy_frame(face), number=args.frames, repeat=3))
+    vectorized_s = min(timeit.repeat(lambda: vectorized_frame(face, buffer), number=args.frames, repeat=3))
+    # Solo la parte numerica, sin la conversion de landmarks
+    points = landmarks_to_array(face.landmark, WIDTH, HEIGHT, buffer, EYE_LANDMARKS)
+    metrics_s = min(timeit.repeat(lambda: eye_metrics(points), number=args.frames, repeat=3))
+
+    print(f"previo       : {legacy_s / args.frames * 1e6:8.1f} us/frame")
+    print(f"vectorizado  : {vectorized_s / args.frames * 1e6:8.1f} us/frame (incluye conversion de {len(EYE_LANDMARKS)} landmarks)")
+    print(f"  eye_metrics: {metrics_s / args.frames * 1e6:8.1f} us/frame")
+
+
+if __name__ == "__main__":
+    main()
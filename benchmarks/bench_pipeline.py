@@ -0,0 +1,233 @@
+"""Benchmark reproducible del pipeline de deteccion completo.
+
+Uso:
+    python benchmarks/bench_pipeline.py --output resultado.json
+    python benchmarks/bench_pipeline.py --video clip.mp4 --baseline previo.json
+
+Alimenta al detector desde una fuente deterministica (frames sinteticos con
+semilla fija o un clip de video) y reporta el tiempo por etapa (capture, flip,
+cvtColor, FaceMesh, FaceDetection, EAR, overlays, display), los FPS de punta a
+punta y la latencia p50/p95/p99 por frame. El resultado es JSON para poder
+comparar corridas; con ``--baseline`` termina con codigo 1 si hay regresion.
+No necesita camara ni ventana (``--display`` activa imshow si hay pantalla).
+
+Las etapas de EAR y pose, y el overlay completo, solo corren cuando FaceMesh
+encuentra un rostro; ``face_frames`` en el resultado dice en cuantos frames
+fue asi, y FaceMesh y FaceDetection se reportan como etapas aparte. Si alguna de ``FACE_STAGES`` termina sin muestras (por
+ejemplo si MediaPipe no reconoce el rostro sintetico) el benchmark falla con
+codigo 2 en lugar de reportar un pipeline que en realidad no se midio; en ese
+caso usar ``--video`` con un clip de un rostro real.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+from pathlib import Path
+
+import cv2
+import mediapipe as mp
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from control_estado import ControlSettings  # noqa: E402
+from detector import DrowsinessDetector  # noqa: E402
+from inferencia import INFERENCE_SIZE  # noqa: E402
+from instrumentacion import STAGES, StageTimer, now  # noqa: E402
+from pantalla import DisplayStage  # noqa: E402
+
+RESULT_SCHEMA = 1
+FACE_STAGES = ("ear", "pose")  # Solo miden algo con rostro; sin muestras la corrida no vale
+
+
+class SyntheticSource:
+    """Frames sinteticos deterministas: ruido con semilla fija y un rostro dibujado.
+
+    El rostro esta pensado para que FaceDetection y FaceMesh lo encuentren
+    (con MediaPipe 0.10.14 se detecta en todos los frames, con otras semillas
+    y tamaños de frame tambien), asi EAR, pose y overlay se miden sin clip.
+    """
+
+    def __init__(self, width: int, height: int, seed: int = 0, variants: int = 8) -> None:
+        rng = np.random.default_rng(seed)
+        self._frames = []
+        for index in range(variants):
+            frame = rng.integers(0, 60, size=(height, width, 3), dtype=np.uint8)
+            cx = width // 2 + (index - variants // 2) * 4
+            cy = height // 2
+            face = (width // 6, height // 4)
+            cv2.ellipse(frame, (cx, cy), face, 0, 0, 360, (140, 170, 210), -1)
+            for side in (-1, 1):
+                eye = (cx + side * face[0] // 2, cy - face[1] // 4)
+                cv2.ellipse(frame, eye, (face[0] // 5, face[1] // 12), 0, 0, 360, (250, 250, 250), -1)
+                cv2.circle(frame, eye, face[1] // 14, (40, 30, 20), -1)
+            cv2.ellipse(frame, (cx, cy + face[1] // 2), (face[0] // 3, face[1] // 12), 0, 0, 180, (60, 60, 150), 4)
+            self._frames.append(frame)
+        self._index = 0
+        self._buffer = np.empty_like(self._frames[0])
+
+    def read(self):
+        # Se copia para simular el costo de recibir un frame nuevo en cada lectura
+        np.copyto(self._buffer, self._frames[self._index % len(self._frames)])
+        self._index += 1
+        return True, self._buffer
+
+    def release(self) -> None:
+        pass
+
+
+def percentiles(values) -> dict:
+    data = np.asarray(values, dtype=np.float64) * 1000.0
+    if data.size == 0:
+        return {"count": 0}
+    p50, p95, p99 = np.percentile(data, [50, 95, 99])
+    return {
+        "count": int(data.size),
+        "mean_ms": float(data.mean()),
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+    }
+
+
+def run(args) -> dict:
+    if args.video:
+        source = cv2.VideoCapture(str(args.video))
+        if not source.isOpened():
+            raise SystemExit(f"No se pudo abrir {args.video}")
+    else:
+        source = SyntheticSource(args.width, args.height, seed=args.seed)
+
+    settings = ControlSettings.defaults()
+    timer = StageTimer()
+    latencies = []
+    face_frames = 0
+    processed = 0
+    display = DisplayStage("bench_pipeline", timer=timer)
+    with DrowsinessDetector(inference_size=args.inference_size, timer=timer, mirror=True) as detector:
+        total_started = None
+        for index in range(args.warmup + args.frames):
+            if index == args.warmup:
+                # Las mediciones empiezan despues del calentamiento de los modelos
+                timer.clear()
+                latencies.clear()
+                face_frames = 0
+                total_started = now()
+
+            frame_started = now()
+            ret, frame = source.read()
+            timer.record("capture", now() - frame_started)
+            if not ret:
+                break
+
+            started = now()
+            analysis = detector.process(frame, settings)
+            timer.record("inference", now() - started)
+            face_frames += analysis.face_found
+
+            # Espejo y overlay se miden siempre, como en angulo.py con ventana
+            shown = display.render(frame, analysis, settings)
+            if args.display:
+                started = now()
+                cv2.imshow("bench_pipeline", shown)
+                cv2.waitKey(1)
+                timer.record("display", now() - started)
+
+            latencies.append(now() - frame_started)
+            if index >= args.warmup:
+                processed += 1
+        elapsed = now() - total_started if total_started is not None else 0.0
+        scheduler = detector.pipeline.scheduler
+        mesh_runs, detection_runs = scheduler.mesh_runs, scheduler.detection_runs
+    source.release()
+    if args.display:
+        cv2.destroyAllWindows()
+
+    return {
+        "schema": RESULT_SCHEMA,
+        "source": str(args.video) if args.video else f"synthetic:{args.width}x{args.height}:seed={args.seed}",
+        "config": {
+            "frames": args.frames,
+            "warmup": args.warmup,
+            "inference_size": args.inference_size,
+            "display": bool(args.display),
+        },
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "numpy": np.__version__,
+            "opencv": cv2.__version__,
+            "mediapipe": mp.__version__,
+        },
+        "frames": processed,
+        "face_frames": int(face_frames),
+        "mesh_runs": mesh_runs,
+        "detection_runs": detection_runs,
+        "fps": processed / elapsed if elapsed > 0 else 0.0,
+        "latency": percentiles(latencies),
+        "stages": {stage: percentiles(timer.samples.get(stage, [])) for stage in STAGES},
+    }
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> list:
+    """Lista de regresiones respecto a una corrida anterior."""
+    problems = []
+    if baseline.get("fps") and result["fps"] < baseline["fps"] * (1 - tolerance):
+        problems.append(f"fps {result['fps']:.1f} < {baseline['fps']:.1f}")
+    for key in ("p50_ms", "p95_ms", "p99_ms"):
+        before = baseline.get("latency", {}).get(key)
+        after = result["latency"].get(key)
+        if before and after and after > before * (1 + tolerance):
+            problems.append(f"latencia {key} {after:.2f} > {before:.2f}")
+    for stage, stats in result["stages"].items():
+        before = baseline.get("stages", {}).get(stage, {}).get("p95_ms")
+        after = stats.get("p95_ms")
+        if before and after and after > before * (1 + tolerance):
+            problems.append(f"etapa {stage} p95 {after:.2f} > {before:.2f} ms")
+    return problems
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--video", type=Path, default=None, help="Clip a usar en lugar de frames sinteticos")
+    parser.add_argument("--frames", type=int, default=300, help="Frames medidos")
+    parser.add_argument("--warmup", type=int, default=30, help="Frames iniciales descartados")
+    parser.add_argument("--width", type=int, default=1040)
+    parser.add_argument("--height", type=int, default=1040)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--inference-size", type=int, default=INFERENCE_SIZE)
+    parser.add_argument("--display", action="store_true", help="Incluir cv2.imshow en la medicion")
+    parser.add_argument("--output", type=Path, default=None, help="Archivo JSON de resultados")
+    parser.add_argument("--baseline", type=Path, default=None, help="JSON de una corrida previa para comparar")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Regresion relativa permitida")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    result = run(args)
+    text = json.dumps(result, indent=2)
+    if args.output:
+        args.output.write_text(text)
+    print(text)
+
+    missing = [stage for stage in FACE_STAGES if not result["stages"][stage]["count"]]
+    if missing:
+        print(f"[ERROR] Sin muestras en {', '.join(missing)} ({result['face_frames']} frames con rostro): "
+              f"la fuente no tiene un rostro que MediaPipe detecte; usar --video con un clip real",
+              file=sys.stderr)
+        return 2
+
+    if args.baseline:
+        problems = compare(result, json.loads(args.baseline.read_text()), args.tolerance)
+        for problem in problems:
+            print(f"[REGRESION] {problem}", file=sys.stderr)
+        if problems:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
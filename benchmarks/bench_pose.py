@@ -0,0 +1,83 @@
+"""Micro-benchmark de la estimacion de pitch: solvePnP en frio vs arranque en caliente.
+
+Uso:
+    python benchmarks/bench_pose.py [--frames 5000]
+    python benchmarks/bench_pose.py --pipeline resultado.json
+
+No necesita camara ni MediaPipe: proyecta el modelo 3D con un cabeceo suave
+y ruido de un pixel, como lo veria FaceMesh en un video. Con ``--pipeline``
+(salida de bench_pipeline.py) reporta el costo de la pose como fraccion del
+p50 de FaceMesh.
+"""
+import argparse
+import json
+import math
+import sys
+import timeit
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from geometria_ojos import NUM_LANDMARKS  # noqa: E402
+from pose_cabeza import MODEL_POINTS, POSE_LANDMARKS, HeadPoseEstimator, camera_matrix  # noqa: E402
+
+WIDTH = 1040
+HEIGHT = 1040
+
+
+def synthetic_faces(frames: int, seed: int = 0):
+    """Landmarks (N, 3) por frame con pitch oscilando +-20 grados y su pitch real."""
+    rng = np.random.default_rng(seed)
+    matrix = camera_matrix(WIDTH, HEIGHT)
+    distortion = np.zeros(4)
+    tvec = np.array([[0.0], [0.0], [2500.0]])
+    faces, truth = [], []
+    for index in range(frames):
+        pitch = 20.0 * math.sin(index / 40.0)
+        rvec = np.array([[math.radians(pitch)], [math.radians(5.0 * math.sin(index / 90.0))], [0.0]])
+        image, _ = cv2.projectPoints(MODEL_POINTS, rvec, tvec, matrix, distortion)
+        points = np.zeros((NUM_LANDMARKS, 3), dtype=np.float32)
+        points[POSE_LANDMARKS, :2] = image.reshape(-1, 2) + rng.normal(0.0, 1.0, size=(len(POSE_LANDMARKS), 2))
+        faces.append(points)
+        truth.append(pitch)
+    return faces, np.array(truth)
+
+
+def run(faces, warm: bool) -> np.ndarray:
+    estimator = HeadPoseEstimator()
+    pitches = np.empty(len(faces))
+    for index, points in enumerate(faces):
+        if not warm:
+            estimator.reset()
+        pitches[index] = estimator.estimate(points, 0, WIDTH, HEIGHT)
+    return pitches
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--pipeline", type=Path, default=None, help="JSON de bench_pipeline.py para comparar con FaceMesh")
+    args = parser.parse_args(argv)
+
+    faces, truth = synthetic_faces(args.frames)
+    results = {}
+    for name, warm in (("frio", False), ("caliente", True)):
+        seconds = min(timeit.repeat(lambda: run(faces, warm), number=1, repeat=args.repeat))
+        error = np.nanmean(np.abs(run(faces, warm) - truth))
+        results[name] = seconds / args.frames * 1e6
+        print(f"{name:9s}: {results[name]:8.1f} us/frame, error medio {error:.2f} grados")
+
+    if args.pipeline:
+        facemesh = json.loads(args.pipeline.read_text())["stages"].get("facemesh", {}).get("p50_ms")
+        if facemesh:
+            fraction = results["caliente"] / 1000.0 / facemesh
+            print(f"pose / FaceMesh p50: {fraction:.1%} ({facemesh:.2f} ms)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""Paso por frame del detector en vivo, comun a angulo.py y a los procesos de supervisor.py.
+
+Lee el frame, decide si pasa por el detector, renueva las estadisticas y,
+con un analisis nuevo, dispara la alerta, publica las metricas de cada
+ocupante y las graba. Ventana, ritmo del bucle y comandos del servicio
+quedan en cada punto de entrada.
+"""
+from typing import Optional
+
+from control_estado import announce_revision
+from instrumentacion import EMPTY_STATS, STATS_INTERVAL, now
+
+
+class DetectionLoop:
+    """Estado que el bucle arrastra entre frames: ultimo frame, analisis, control y estadisticas.
+
+    ``source`` es un ``FrameGrabber`` o un ``VideoFileReader``. En los frames
+    que el ``InferenceRateScheduler`` salta, ``analysis`` sigue siendo el
+    ultimo calculado y no se emiten metricas repetidas.
+    """
+
+    def __init__(self, detector, source, control_watcher, metrics_writer, alert_engine, inference_rate,
+                 timer, recorder=None, stream_id: int = 0) -> None:
+        self.detector = detector
+        self.source = source
+        self.control_watcher = control_watcher
+        self.metrics_writer = metrics_writer
+        self.alert_engine = alert_engine
+        self.inference_rate = inference_rate
+        self.timer = timer
+        self.recorder = recorder
+        self.stream_id = stream_id
+        self.applied_revision: Optional[int] = None  # Ultima revision del archivo de control avisada al panel
+        self.frame = None
+        self.analysis = None
+        self.control = None
+        self.stats = EMPTY_STATS
+        self.snapshots = 0  # Estadisticas calculadas desde el arranque
+        self._next_stats = now() + STATS_INTERVAL
+
+    def reset(self) -> None:
+        """Nueva sesion sobre el mismo detector: recalibra y descarta el analisis previo a la pausa.
+
+        Los tiempos tambien empiezan de cero: los FPS no deben promediar con la pausa.
+        """
+        self.detector.reset_calibration()
+        self.inference_rate.reset()
+        self.analysis = None
+        self.timer.reset()
+        self.stats = EMPTY_STATS
+        self._next_stats = now() + STATS_INTERVAL
+
+    def step(self) -> bool:
+        """Procesa el siguiente frame de la fuente; False cuando ya no hay mas."""
+        self.control = self.control_watcher.poll()
+        if self.control.revision != self.applied_revision:
+            self.applied_revision = self.control.revision
+            announce_revision(self.applied_revision, self.stream_id)
+
+        started = now()
+        captured = self.source.read()
+        self.timer.record("capture", now() - started)
+        if captured is None:
+            return False
+        self.frame = captured.frame
+
+        # El ritmo de inferencia sigue el tiempo de la fuente: en videos, la posicion del archivo
+        started = now()
+        fresh = self.inference_rate.should_infer(captured.timestamp)
+        if fresh:
+            self.analysis = self.detector.process(self.frame, self.control)
+            self.timer.record("inference", now() - started)
+            self.inference_rate.update(self.analysis)
+
+        if started >= self._next_stats:
+            self.stats = self.timer.snapshot(self.source.dropped_frames)
+            self.stats.stages["alert_latency"] = self.alert_engine.latency_stats()
+            self._next_stats = started + STATS_INTERVAL
+            self.snapshots += 1
+
+        if fresh and self.analysis.face_found:
+            self._publish(captured.timestamp)
+        return True
+
+    def _publish(self, timestamp: float) -> None:
+        analysis = self.analysis
+        if analysis.alert and self.control.sound_alert:
+            self.alert_engine.trigger()
+        # Un registro por ocupante
+        for face in analysis.occupants:
+            self.metrics_writer.write(
+                analysis.frame,
+                face.ear_raw,
+                face.ear_metric,
+                face.ear_smoothed,
+                face.ear_threshold,
+                face.eye_state,
+                face.closed_frames,
+                self.stats,
+                face.alert,
+                face.face_id,
+                face.pitch,
+                face.head_state,
+            )
+            if self.recorder is not None:
+                self.recorder.write(analysis.frame, face, self.stats, timestamp)
@@ -0,0 +1,170 @@
+import threading
+import time
+from typing import NamedTuple, Optional
+
+import cv2
+import numpy as np
+
+from memoria import BufferPool
+
+
+class CapturedFrame(NamedTuple):
+    """Frame entregado por el hilo de captura junto con su metadata."""
+    frame: np.ndarray
+    timestamp: float  # time.monotonic() justo despues de cap.read(); en videos, segundos del video
+    seq: int  # Numero de secuencia, empieza en 1
+
+
+class FrameGrabber:
+    """Hilo dueño del cv2.VideoCapture que conserva solo el frame mas reciente.
+
+    El lector siempre recibe el ultimo frame capturado; los frames que nadie
+    llego a consumir se cuentan en ``dropped_frames``. Los frames se leen
+    sobre un anillo de buffers preasignados (``cap.read(dst)``): el que tiene
+    el lector, el ultimo publicado y el que se esta llenando. Por eso el frame
+    que entrega ``read()`` es valido solo hasta la siguiente llamada.
+    """
+
+    def __init__(self, cap, ring_size: int = 3) -> None:
+        self.cap = cap
+        self._ring = [None] * max(3, ring_size)  # Anillo pequeño de CapturedFrame
+        self._latest_slot = -1
+        self._held_slot = -1  # Slot que usa el lector hasta su proxima lectura
+        self.buffers = BufferPool()  # Solo lo toca el hilo de captura
+        self._latest_seq = 0
+        self._consumed_seq = 0
+        self._cond = threading.Condition()
+        self._running = False
+        self._paused = False
+        self._finished = False
+        self._thread: Optional[threading.Thread] = None
+        self.captured_frames = 0
+        self.dropped_frames = 0
+
+    def start(self) -> "FrameGrabber":
+        """Arranca el hilo de captura en segundo plano."""
+        if self._thread is not None:
+            return self
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="FrameGrabber", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        """Lee la camara sin pausa y publica cada frame en el anillo."""
+        shape = None
+        while self._running:
+            with self._cond:
+                self._cond.wait_for(lambda: not self._paused or not self._running)
+                if not self._running:
+                    break
+                # Nunca se escribe sobre el frame del lector ni sobre el ultimo publicado
+                slot = next(index for index in range(len(self._ring))
+                            if index not in (self._latest_slot, self._held_slot))
+            name = f"frame{slot}"
+            if shape is None:
+                ret, frame = self.cap.read()
+                if ret:
+                    self.buffers.adopt(name, frame)
+            else:
+                dst = self.buffers.take(name, shape)
+                ret, frame = self.cap.read(dst)
+                if ret:
+                    self.buffers.confirm(name, dst, frame)
+            timestamp = time.monotonic()
+            if not ret:
+                break
+            shape = frame.shape
+            with self._cond:
+                seq = self._latest_seq + 1
+                self._ring[slot] = CapturedFrame(frame, timestamp, seq)
+                self._latest_slot = slot
+                self._latest_seq = seq
+                self.captured_frames += 1
+                self._cond.notify_all()
+        with self._cond:
+            self._finished = True
+            self._cond.notify_all()
+
+    def read(self, timeout: Optional[float] = None) -> Optional[CapturedFrame]:
+        """Devuelve el frame mas nuevo que aun no se consumio.
+
+        Bloquea hasta que llega un frame nuevo; devuelve None si la camara dejo
+        de entregar frames o si vence el ``timeout``.
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._latest_seq > self._consumed_seq or self._finished, timeout):
+                return None
+            if self._latest_seq <= self._consumed_seq:
+                return None
+            captured = self._ring[self._latest_slot]
+            self._held_slot = self._latest_slot
+            # Todo lo que se capturo entre la lectura anterior y esta se descarto
+            self.dropped_frames += captured.seq - self._consumed_seq - 1
+            self._consumed_seq = captured.seq
+            return captured
+
+    def pause(self) -> None:
+        """Deja de leer la camara sin soltarla; el lector queda esperando hasta ``resume()``."""
+        with self._cond:
+            self._paused = True
+
+    def resume(self) -> None:
+        with self._cond:
+            self._paused = False
+            # Lo publicado antes de la pausa ya es viejo: el lector espera el siguiente frame
+            self._consumed_seq = self._latest_seq
+            self._cond.notify_all()
+
+    def stop(self) -> None:
+        """Detiene el hilo y libera la camara."""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+        self.cap.release()
+
+
+class VideoFileReader:
+    """Lee un video frame a frame con la misma interfaz que ``FrameGrabber``.
+
+    Sin hilo ni descartes: cada ``read()`` entrega el siguiente frame del
+    archivo, sobre un buffer reutilizado que vale hasta la siguiente llamada.
+    El ``timestamp`` es la posicion en el video (``CAP_PROP_POS_MSEC``), no el
+    reloj: el archivo se decodifica mas rapido que en vivo y asi el ritmo de
+    inferencia y las grabaciones no dependen de la velocidad del equipo.
+    """
+
+    def __init__(self, cap) -> None:
+        self.cap = cap
+        self.buffers = BufferPool()
+        self._shape = None
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        self._frame_interval = 1.0 / fps if fps > 0 else 1.0 / 30
+        self._timestamp = -self._frame_interval
+        self.captured_frames = 0
+        self.dropped_frames = 0  # Siempre 0: se procesan todos los frames
+
+    def read(self) -> Optional[CapturedFrame]:
+        if self._shape is None:
+            ret, frame = self.cap.read()
+            if ret:
+                self.buffers.adopt("frame", frame)
+        else:
+            dst = self.buffers.take("frame", self._shape)
+            ret, frame = self.cap.read(dst)
+            if ret:
+                self.buffers.confirm("frame", dst, frame)
+        if not ret:
+            return None
+        self._shape = frame.shape
+        self.captured_frames += 1
+        position = self.cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+        # Algunos contenedores no reportan la posicion: se avanza un frame segun los FPS
+        self._timestamp = position if position > self._timestamp else self._timestamp + self._frame_interval
+        return CapturedFrame(frame, self._timestamp, self.captured_frames)
+
+    def stop(self) -> None:
+        self.cap.release()
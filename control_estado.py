@@ -0,0 +1,235 @@
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+
+CONTROL_FILE = Path(__file__).with_name("control_state.json")
+DEFAULT_CONTROL_STATE = {
+    "revision": 0,
+    "recalibrate_token": 0,
+    "overlays": {
+        "landmarks": True,
+        "geometry": True,
+        "text": True
+    },
+    "settings": {
+        "ear_dynamic_ratio": 0.92,
+        "frame_threshold": 50,
+        "pitch_forward_threshold": 12.0,
+        "pitch_backward_threshold": -8.0,
+        "sound_alert": True,
+        "visual_alert": True,
+        "theme": "dark",
+        "presentation_mode": False
+    }
+}
+CONTROL_POLL_INTERVAL = 0.25  # Segundos entre cada stat() del archivo de control
+REPLACE_RETRIES = 5  # En Windows os.replace falla si el lector tiene el archivo abierto en ese instante
+REPLACE_RETRY_DELAY = 0.01
+REVISION_PREFIX = "[CONTROL] "  # Aviso por stderr de la revision que aplica el detector
+
+
+def write_control_state_file(data: dict, path: Path = CONTROL_FILE) -> None:
+    """Escribe el estado de forma atomica: archivo temporal en la misma carpeta y os.replace.
+
+    Quien lea el archivo ve la version anterior o la nueva completa, nunca un
+    JSON a medio escribir.
+    """
+    path = Path(path)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as handle:
+        json.dump(data, handle, indent=2)
+        handle.flush()
+        os.fsync(handle.fileno())
+    for attempt in range(REPLACE_RETRIES):
+        try:
+            os.replace(tmp_path, path)
+            return
+        except PermissionError:
+            if attempt == REPLACE_RETRIES - 1:
+                os.unlink(tmp_path)
+                raise
+            time.sleep(REPLACE_RETRY_DELAY)
+
+
+def ensure_control_state_file(path: Path = CONTROL_FILE) -> dict:
+    if not path.exists():
+        write_control_state_file(DEFAULT_CONTROL_STATE, path)
+        return DEFAULT_CONTROL_STATE.copy()
+    try:
+        data = json.loads(path.read_text())
+        if not isinstance(data, dict):
+            raise ValueError("Invalid control state format")
+        overlays = data.get("overlays")
+        if not isinstance(overlays, dict):
+            data["overlays"] = DEFAULT_CONTROL_STATE["overlays"].copy()
+            overlays = data["overlays"]
+        else:
+            for key, value in DEFAULT_CONTROL_STATE["overlays"].items():
+                overlays.setdefault(key, value)
+
+        settings = data.get("settings")
+        if not isinstance(settings, dict):
+            data["settings"] = DEFAULT_CONTROL_STATE["settings"].copy()
+        else:
+            for key, value in DEFAULT_CONTROL_STATE["settings"].items():
+                settings.setdefault(key, value)
+        if "recalibrate_token" not in data:
+            data["recalibrate_token"] = 0
+        data.setdefault("revision", 0)
+        return data
+
+    except Exception:
+        write_control_state_file(DEFAULT_CONTROL_STATE, path)
+        return DEFAULT_CONTROL_STATE.copy()
+
+
+class ControlSettings:
+    """Vista tipada e inmutable del archivo de control, validada una sola vez."""
+
+    __slots__ = (
+        "revision",  # Crece con cada escritura del panel; indica que version se aplico
+        "recalibrate_token",
+        "show_landmarks",
+        "show_geometry",
+        "show_text",
+        "ear_dynamic_ratio",
+        "frame_threshold",
+        "pitch_forward_threshold",
+        "pitch_backward_threshold",
+        "sound_alert",
+        "visual_alert",
+        "theme",
+        "presentation_mode",
+    )
+
+    def __init__(self, **values) -> None:
+        for name in self.__slots__:
+            object.__setattr__(self, name, values[name])
+
+    def __setattr__(self, name, value) -> None:
+        raise AttributeError("ControlSettings es inmutable")
+
+    def __reduce__(self):
+        # Permite enviar los ajustes a otros procesos pese al __setattr__ bloqueado
+        return (_settings_from_values, (tuple(getattr(self, name) for name in self.__slots__),))
+
+    @classmethod
+    def from_dict(cls, data: dict, previous: Optional["ControlSettings"] = None) -> "ControlSettings":
+        """Convierte el JSON crudo en tipos concretos, con respaldo en el estado previo."""
+        fallback = previous if previous is not None else cls.defaults()
+        overlays = data.get("overlays")
+        if not isinstance(overlays, dict):
+            overlays = {
+                "landmarks": fallback.show_landmarks,
+                "geometry": fallback.show_geometry,
+                "text": fallback.show_text,
+            }
+        settings = data.get("settings")
+        if not isinstance(settings, dict):
+            settings = {}
+        defaults = DEFAULT_CONTROL_STATE["settings"]
+        return cls(
+            revision=int(data.get("revision", fallback.revision)),
+            recalibrate_token=data.get("recalibrate_token", fallback.recalibrate_token),
+            show_landmarks=bool(overlays.get("landmarks", True)),
+            show_geometry=bool(overlays.get("geometry", True)),
+            show_text=bool(overlays.get("text", True)),
+            ear_dynamic_ratio=float(settings.get("ear_dynamic_ratio", defaults["ear_dynamic_ratio"])),
+            frame_threshold=max(1, int(settings.get("frame_threshold", defaults["frame_threshold"]))),
+            pitch_forward_threshold=float(settings.get("pitch_forward_threshold", defaults["pitch_forward_threshold"])),
+            pitch_backward_threshold=float(settings.get("pitch_backward_threshold", defaults["pitch_backward_threshold"])),
+            sound_alert=bool(settings.get("sound_alert", defaults["sound_alert"])),
+            visual_alert=bool(settings.get("visual_alert", defaults["visual_alert"])),
+            theme=settings.get("theme", defaults["theme"]),
+            presentation_mode=bool(settings.get("presentation_mode", defaults["presentation_mode"])),
+        )
+
+    @classmethod
+    def defaults(cls) -> "ControlSettings":
+        defaults = DEFAULT_CONTROL_STATE["settings"]
+        overlays = DEFAULT_CONTROL_STATE["overlays"]
+        return cls(
+            revision=DEFAULT_CONTROL_STATE["revision"],
+            recalibrate_token=DEFAULT_CONTROL_STATE["recalibrate_token"],
+            show_landmarks=overlays["landmarks"],
+            show_geometry=overlays["geometry"],
+            show_text=overlays["text"],
+            ear_dynamic_ratio=defaults["ear_dynamic_ratio"],
+            frame_threshold=defaults["frame_threshold"],
+            pitch_forward_threshold=defaults["pitch_forward_threshold"],
+            pitch_backward_threshold=defaults["pitch_backward_threshold"],
+            sound_alert=defaults["sound_alert"],
+            visual_alert=defaults["visual_alert"],
+            theme=defaults["theme"],
+            presentation_mode=defaults["presentation_mode"],
+        )
+
+
+def build_settings(control_file, ear_ratio, frame_threshold) -> ControlSettings:
+    """Ajustes del archivo de control (o los predeterminados) con los overrides de la linea de comandos."""
+    data = json.loads(Path(control_file).read_text()) if control_file else json.loads(json.dumps(DEFAULT_CONTROL_STATE))
+    settings = data.setdefault("settings", {})
+    if ear_ratio is not None:
+        settings["ear_dynamic_ratio"] = ear_ratio
+    if frame_threshold is not None:
+        settings["frame_threshold"] = frame_threshold
+    return ControlSettings.from_dict(data)
+
+
+def announce_revision(revision: int, stream_id: int = 0) -> None:
+    """Avisa al panel, por stderr, que revision del archivo de control esta aplicando el detector."""
+    print(f"{REVISION_PREFIX}stream={stream_id} revision={revision}", file=sys.stderr, flush=True)
+
+
+def _settings_from_values(values: tuple) -> ControlSettings:
+    return ControlSettings(**dict(zip(ControlSettings.__slots__, values)))
+
+
+class ControlStateWatcher:
+    """Recarga el archivo de control solo cuando cambia su mtime, tamaño o inodo.
+
+    ``poll()`` es barato: la mayoria de las llamadas solo comparan un reloj y,
+    como mucho cada ``poll_interval`` segundos, hacen un ``os.stat``. El JSON se
+    parsea unicamente cuando la firma del archivo cambio.
+    """
+
+    def __init__(self, path: Path = CONTROL_FILE, poll_interval: float = CONTROL_POLL_INTERVAL) -> None:
+        self.path = Path(path)
+        self.poll_interval = max(0.0, float(poll_interval))
+        self.reloads = 0  # Cuantas veces se leyo y parseo el archivo
+        self.settings = ControlSettings.from_dict(ensure_control_state_file(self.path))
+        self._signature = self._stat_signature()
+        self._next_poll = time.monotonic() + self.poll_interval
+
+    def _stat_signature(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        # os.replace crea un inodo nuevo, asi se nota el cambio aunque mtime y tamaño coincidan
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def poll(self) -> ControlSettings:
+        """Devuelve los ajustes vigentes, releyendo el archivo solo si cambio."""
+        now = time.monotonic()
+        if now < self._next_poll:
+            return self.settings
+        self._next_poll = now + self.poll_interval
+        signature = self._stat_signature()
+        if signature == self._signature:
+            return self.settings
+        try:
+            data = json.loads(self.path.read_text())
+            if not isinstance(data, dict):
+                raise ValueError("Invalid control state format")
+            settings = ControlSettings.from_dict(data, self.settings)
+        except Exception:
+            # Se conserva la firma anterior para reintentar en el siguiente poll
+            return self.settings
+        self.settings = settings
+        self.reloads += 1
+        self._signature = signature
+        return self.settings
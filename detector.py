@@ -0,0 +1,267 @@
+import os
+os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '3')  # Oculta advertencias de TensorFlow
+from typing import List, NamedTuple, Optional
+
+import cv2
+import mediapipe as mp
+import numpy as np
+
+from control_estado import ControlSettings
+from estadisticas import SlidingMedian
+from geometria_ojos import eye_metrics
+from inferencia import INFERENCE_SIZE, MAX_FACES, FacePipeline
+from instrumentacion import NULL_TIMER, now
+from memoria import BufferPool
+from pose_cabeza import HEAD_STATES, HeadPoseEstimator
+from seguimiento import FaceTracker
+from telemetria import EYE_STATES
+from umbrales import (
+    BASELINE_WINDOW_FRAMES,
+    CALIBRATION_FRAMES,
+    EAR_BASELINE_ALPHA,
+    EAR_BASELINE_GUARD_RATIO,
+    EAR_MIN_MARGIN,
+    EAR_SMOOTHING_WINDOW,
+    EAR_THRESH,
+    MIN_DYNAMIC_EAR,
+)
+
+mp_face_mesh = mp.solutions.face_mesh
+mp_face_detection = mp.solutions.face_detection
+
+
+class FaceState(NamedTuple):
+    """Resultado de un ocupante en el frame."""
+    face_id: int  # Estable mientras el rostro siga a la vista
+    points: np.ndarray  # Landmarks (N, 3) en pixeles del frame recibido
+    ear_raw: float
+    ear_metric: float
+    ear_smoothed: float
+    ear_threshold: float
+    eye_state: str
+    closed_frames: int
+    alert: bool
+    pitch: float  # Grados respecto a la postura calibrada; positivo hacia adelante
+    head_state: str  # "centro", "adelante" o "atras" segun los umbrales de pitch
+
+
+class FrameAnalysis(NamedTuple):
+    """Resultado de analizar un frame; los campos EAR son NaN si no hubo rostro.
+
+    Los campos sueltos corresponden al ocupante principal (el seguido desde hace
+    mas tiempo); ``occupants`` trae a todos, ordenados por ``face_id``.
+    """
+    frame: int
+    faces: List[np.ndarray]  # Landmarks (N, 3) en pixeles del frame recibido
+    face_found: bool
+    ear_raw: float
+    ear_metric: float
+    ear_smoothed: float
+    ear_threshold: float
+    eye_state: str
+    closed_frames: int
+    alert: bool  # Algun ocupante alcanzo el umbral configurado de frames cerrados
+    pitch: float
+    head_state: str
+    occupants: List[FaceState]
+
+
+class DrowsinessDetector:
+    """Logica de somnolencia por frame, sin camara ni ventana.
+
+    Recibe frames BGR tal como salen de la camara y conserva el estado entre
+    frames: historial de EAR, linea base y frames cerrados. Lo usan tanto el
+    modo en vivo de angulo.py como el procesamiento por lotes. Con
+    ``mirror=True`` los landmarks se devuelven en coordenadas de la vista
+    espejo (x -> ancho - x) sin voltear el frame completo.
+
+    El estado de cada ocupante vive en arreglos con una fila por slot del
+    ``FaceTracker`` (estructura de arreglos), asi EAR, umbrales y contadores
+    de todos los rostros se actualizan en un solo paso vectorizado.
+    """
+
+    def __init__(self, inference_size: int = INFERENCE_SIZE, timer=NULL_TIMER, max_faces: int = MAX_FACES,
+                 mirror: bool = False, buffers: Optional[BufferPool] = None) -> None:
+        self.max_faces = max(1, int(max_faces))
+        self.mirror = mirror
+        # Destino reutilizable de cvtColor y del recorte que recibe FaceMesh
+        self.buffers = buffers if buffers is not None else BufferPool()
+        # Inicializar Face Detection
+        self.face_detection = mp_face_detection.FaceDetection(model_selection=0, min_detection_confidence=0.5)
+        # Configurar Face Mesh para detectar hasta max_faces rostros
+        self.face_mesh = mp_face_mesh.FaceMesh(
+            min_detection_confidence=0.5,
+            static_image_mode=False,  # Modo dinamico para video en tiempo real
+            max_num_faces=self.max_faces,
+            refine_landmarks=True)
+        self.pipeline = FacePipeline(self.face_mesh, self.face_detection, inference_size=inference_size,
+                                     timer=timer, max_faces=self.max_faces, buffers=self.buffers)
+        self.timer = timer  # Mide cvtColor y la matematica del EAR; el pipeline mide los modelos
+        self.tracker = FaceTracker(self.max_faces)
+
+        slots = self.max_faces
+        self.closed_frames = np.zeros(slots, dtype=np.int64)
+        # Buffers para mejorar la estabilidad de la medida: anillo corto de EAR por slot
+        self.ear_history = np.zeros((slots, EAR_SMOOTHING_WINDOW), dtype=np.float64)
+        self.history_count = np.zeros(slots, dtype=np.int64)
+        # Mediana movil del EAR abierto; cuesta O(log n) por frame aunque la ventana sea de minutos
+        self.ear_baseline_values = [SlidingMedian(BASELINE_WINDOW_FRAMES) for _ in range(slots)]
+        self.ear_baseline = np.full(slots, np.nan)  # NaN mientras el slot calibra
+        # Pitch neutral de cada ocupante: promedio durante la calibracion del EAR
+        self.head_pose = HeadPoseEstimator(slots)
+        self.pitch_sum = np.zeros(slots, dtype=np.float64)
+        self.pitch_count = np.zeros(slots, dtype=np.int64)
+        self.frame_counter = 0
+        self.last_recalibrate_token = None
+
+    def _reset_slots(self, slots) -> None:
+        self.ear_history[slots] = 0.0
+        self.history_count[slots] = 0
+        self.ear_baseline[slots] = np.nan
+        self.closed_frames[slots] = 0
+        self.pitch_sum[slots] = 0.0
+        self.pitch_count[slots] = 0
+        self.head_pose.reset(slots)
+        for slot in np.atleast_1d(slots).tolist():
+            self.ear_baseline_values[slot].clear()
+
+    def reset_calibration(self) -> None:
+        self._reset_slots(np.arange(self.max_faces))
+
+    def _update_faces(self, slots: np.ndarray, ear: np.ndarray, settings: ControlSettings):
+        """Un paso de suavizado, linea base, umbral y contador para todos los rostros del frame."""
+        window = EAR_SMOOTHING_WINDOW
+        counts = self.history_count[slots]
+        self.ear_history[slots, counts % window] = ear
+        counts += 1
+        self.history_count[slots] = counts
+        ear_smoothed = self.ear_history[slots].sum(axis=1) / np.minimum(counts, window)
+
+        baseline = self.ear_baseline[slots]
+        calibrating = np.isnan(baseline)
+        # Ajuste suave solo cuando el EAR sigue en la zona abierta
+        accept = calibrating | (ear_smoothed >= baseline * EAR_BASELINE_GUARD_RATIO)
+        targets = np.full(len(slots), np.nan)
+        filled = np.zeros(len(slots), dtype=np.int64)
+        for index in np.flatnonzero(accept).tolist():
+            median = self.ear_baseline_values[slots[index]]
+            targets[index] = median.push(ear_smoothed[index])
+            filled[index] = len(median)
+        baseline = np.where(calibrating & (filled >= CALIBRATION_FRAMES), targets, baseline)
+        adapt = ~calibrating & accept
+        baseline[adapt] = baseline[adapt] * (1 - EAR_BASELINE_ALPHA) + targets[adapt] * EAR_BASELINE_ALPHA
+        self.ear_baseline[slots] = baseline
+
+        calibrated = ~np.isnan(baseline)
+        drop = np.maximum(EAR_MIN_MARGIN, baseline * (1 - settings.ear_dynamic_ratio))
+        ear_threshold = np.where(calibrated, np.maximum(MIN_DYNAMIC_EAR, baseline - drop), EAR_THRESH)
+
+        closed = calibrated & (ear_smoothed < ear_threshold)
+        closed_frames = np.where(closed, self.closed_frames[slots] + 1, 0)
+        self.closed_frames[slots] = closed_frames
+        eye_state = np.where(calibrated, np.where(closed, 2, 1), 0)  # Indices de EYE_STATES
+        return ear_smoothed, ear_threshold, eye_state, closed_frames
+
+    def _update_pose(self, faces: List[np.ndarray], slots: np.ndarray, eye_state: np.ndarray,
+                     width: int, height: int, settings: ControlSettings):
+        """Pitch relativo a la postura neutral y su clasificacion, para todos los rostros del frame."""
+        pitch_raw = np.array([
+            self.head_pose.estimate(points, slot, width, height)
+            for points, slot in zip(faces, slots.tolist())
+        ])
+        # Mientras se calibra el EAR el conductor mira al frente: esa es la postura neutral
+        neutral_sample = (eye_state == 0) & ~np.isnan(pitch_raw)
+        self.pitch_sum[slots[neutral_sample]] += pitch_raw[neutral_sample]
+        self.pitch_count[slots[neutral_sample]] += 1
+        counts = self.pitch_count[slots]
+        neutral = np.where(counts > 0, self.pitch_sum[slots] / np.maximum(counts, 1), 0.0)
+        pitch = pitch_raw - neutral
+        head_state = np.where(
+            pitch > settings.pitch_forward_threshold,
+            1,
+            np.where(pitch < settings.pitch_backward_threshold, 2, 0),
+        )  # Indices de HEAD_STATES
+        return pitch, head_state
+
+    def process(self, frame_bgr: np.ndarray, settings: ControlSettings) -> FrameAnalysis:
+        if self.last_recalibrate_token is None:
+            self.last_recalibrate_token = settings.recalibrate_token
+        elif settings.recalibrate_token != self.last_recalibrate_token:
+            self.last_recalibrate_token = settings.recalibrate_token
+            self.reset_calibration()
+
+        self.frame_counter += 1
+        started = now()
+        dst = self.buffers.take("rgb", frame_bgr.shape)
+        frame_rgb = self.buffers.confirm("rgb", dst, cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB, dst=dst))
+        self.timer.record("cvtcolor", now() - started)
+        # FaceMesh corre sobre un recorte reducido que sigue al rostro; FaceDetection solo para reacquirir
+        results = self.pipeline.process(frame_rgb)
+        if not results.faces:
+            self.closed_frames[:] = 0
+            nan = float("nan")
+            return FrameAnalysis(self.frame_counter, [], False, nan, nan, nan, nan, "calibrando", 0, False,
+                                 nan, HEAD_STATES[0], [])
+
+        started = now()
+        height, width = frame_bgr.shape[:2]
+        landmarks = results.landmarks
+        if self.mirror:
+            # El pipeline ya calculo su ROI; el buffer se puede reflejar en su lugar
+            np.subtract(width, landmarks[..., 0], out=landmarks[..., 0])
+        slots, new_slots = self.tracker.assign(landmarks)
+        if new_slots:
+            self._reset_slots(new_slots)
+        # Los ocupantes que no aparecen en este frame no acumulan frames cerrados
+        absent = np.ones(self.max_faces, dtype=bool)
+        absent[slots] = False
+        self.closed_frames[absent] = 0
+
+        ear_eyes, vertical_eyes = eye_metrics(landmarks)  # (F, 2)
+        ear_raw = ear_eyes.mean(axis=1)
+        ear = np.minimum(ear_eyes, vertical_eyes).mean(axis=1)
+        ear_smoothed, ear_threshold, eye_state, closed_frames = self._update_faces(slots, ear, settings)
+        alert = closed_frames >= settings.frame_threshold
+        self.timer.record("ear", now() - started)
+
+        started = now()
+        pitch, head_state = self._update_pose(results.faces, slots, eye_state, width, height, settings)
+        self.timer.record("pose", now() - started)
+
+        face_ids = self.tracker.ids[slots]
+        occupants = sorted(
+            (
+                FaceState(face_id, points, *values, EYE_STATES[state], closed, bool(alerted), angle, HEAD_STATES[head])
+                for face_id, points, *values, state, closed, alerted, angle, head in zip(
+                    face_ids.tolist(), results.faces, ear_raw.tolist(), ear.tolist(), ear_smoothed.tolist(),
+                    ear_threshold.tolist(), eye_state.tolist(), closed_frames.tolist(), alert.tolist(),
+                    pitch.tolist(), head_state.tolist())
+            ),
+            key=lambda occupant: occupant.face_id,
+        )
+        primary = occupants[0]
+        return FrameAnalysis(
+            self.frame_counter,
+            [occupant.points for occupant in occupants],
+            True,
+            primary.ear_raw,
+            primary.ear_metric,
+            primary.ear_smoothed,
+            primary.ear_threshold,
+            primary.eye_state,
+            primary.closed_frames,
+            bool(alert.any()),
+            primary.pitch,
+            primary.head_state,
+            occupants,
+        )
+
+    def close(self) -> None:
+        self.face_mesh.close()
+        self.face_detection.close()
+
+    def __enter__(self) -> "DrowsinessDetector":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,115 @@
+"""Estadisticas en flujo para el EAR: mediana sobre una ventana movil.
+
+La ventana se conserva en un deque y la mediana se actualiza al agregar
+cada muestra, sin recorrer ni ordenar la ventana completa. Asi la linea
+base puede calcularse sobre minutos de historial con el mismo costo por
+frame que sobre unos pocos frames.
+"""
+import heapq
+from collections import deque
+from typing import Dict, List
+
+
+class SlidingMedian:
+    """Mediana de las ultimas ``window`` muestras en O(log n) por muestra.
+
+    Usa dos heaps: ``_low`` (max-heap con la mitad menor, con signo negado) y
+    ``_high`` (min-heap con la mitad mayor). La muestra que sale de la ventana
+    no se busca dentro del heap; se marca en ``_delayed`` y se descarta cuando
+    llega a la cima. Con un numero par de muestras devuelve el promedio de las
+    dos centrales, igual que ``np.median``.
+    """
+
+    def __init__(self, window: int) -> None:
+        self.window = int(window)
+        self._values = deque()
+        self._low: List[float] = []
+        self._high: List[float] = []
+        self._low_size = 0  # Elementos vigentes en cada heap (sin contar los marcados)
+        self._high_size = 0
+        self._delayed: Dict[float, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def push(self, value: float) -> float:
+        """Agrega una muestra, descarta la mas antigua si la ventana esta llena y devuelve la mediana."""
+        value = float(value)
+        self._values.append(value)
+        if not self._low or value <= -self._low[0]:
+            heapq.heappush(self._low, -value)
+            self._low_size += 1
+        else:
+            heapq.heappush(self._high, value)
+            self._high_size += 1
+
+        if len(self._values) > self.window:
+            self._discard(self._values.popleft())
+        self._rebalance()
+
+        if len(self._low) + len(self._high) > 4 * self.window:
+            self._compact()
+        return self.median
+
+    @property
+    def median(self) -> float:
+        if not self._values:
+            return float("nan")
+        if self._low_size > self._high_size:
+            return -self._low[0]
+        return (-self._low[0] + self._high[0]) / 2.0
+
+    def clear(self) -> None:
+        self._values.clear()
+        self._low.clear()
+        self._high.clear()
+        self._low_size = self._high_size = 0
+        self._delayed.clear()
+
+    def _discard(self, value: float) -> None:
+        self._delayed[value] = self._delayed.get(value, 0) + 1
+        if value <= -self._low[0]:
+            self._low_size -= 1
+            if value == -self._low[0]:
+                self._prune(self._low, -1.0)
+        else:
+            self._high_size -= 1
+            if value == self._high[0]:
+                self._prune(self._high, 1.0)
+
+    def _prune(self, heap: List[float], sign: float) -> None:
+        # Saca de la cima los valores que ya salieron de la ventana
+        while heap:
+            value = sign * heap[0]
+            count = self._delayed.get(value)
+            if not count:
+                break
+            if count == 1:
+                del self._delayed[value]
+            else:
+                self._delayed[value] = count - 1
+            heapq.heappop(heap)
+
+    def _rebalance(self) -> None:
+        # _low guarda la mitad menor y, con cantidad impar, una muestra de mas
+        if self._low_size > self._high_size + 1:
+            heapq.heappush(self._high, -heapq.heappop(self._low))
+            self._low_size -= 1
+            self._high_size += 1
+            self._prune(self._low, -1.0)
+        elif self._low_size < self._high_size:
+            heapq.heappush(self._low, -heapq.heappop(self._high))
+            self._low_size += 1
+            self._high_size -= 1
+            self._prune(self._high, 1.0)
+
+    def _compact(self) -> None:
+        # Reconstruye los heaps desde la ventana para liberar los valores marcados
+        ordered = sorted(self._values)
+        half = (len(ordered) + 1) // 2
+        self._low = [-value for value in ordered[:half]]
+        heapq.heapify(self._low)
+        self._high = ordered[half:]
+        heapq.heapify(self._high)
+        self._low_size, self._high_size = half, len(ordered) - half
+        self._delayed.clear()
@@ -0,0 +1,91 @@
+from itertools import chain
+
+import numpy as np
+
+NUM_LANDMARKS = 478  # FaceMesh con refine_landmarks=True (468 + 10 de iris)
+
+index_left_eye = [33, 160, 158, 133, 153, 144]
+index_right_eye = [362, 385, 387, 263, 373, 380]
+LEFT_EYE_VERTICAL_PAIRS = [(159, 145), (158, 144), (160, 153)]
+RIGHT_EYE_VERTICAL_PAIRS = [(386, 374), (385, 380), (387, 381)]
+LEFT_EYE_HORIZONTAL_PAIR = (33, 133)
+RIGHT_EYE_HORIZONTAL_PAIR = (362, 263)
+
+# Landmarks de los dos ojos en el orden p1..p6 del EAR, forma (2, 6)
+EYE_INDEX = np.array([index_left_eye, index_right_eye], dtype=np.intp)
+
+
+def _eye_segments(eye, vertical_pairs, horizontal_pair):
+    # Por ojo: 2 verticales del EAR, 1 horizontal del EAR, 3 pares verticales y el par horizontal
+    return [
+        (eye[1], eye[5]),
+        (eye[2], eye[4]),
+        (eye[0], eye[3]),
+        *vertical_pairs,
+        horizontal_pair,
+    ]
+
+
+# Todos los segmentos que se miden por frame, forma (2, 7, 2)
+EYE_SEGMENTS = np.array([
+    _eye_segments(index_left_eye, LEFT_EYE_VERTICAL_PAIRS, LEFT_EYE_HORIZONTAL_PAIR),
+    _eye_segments(index_right_eye, RIGHT_EYE_VERTICAL_PAIRS, RIGHT_EYE_HORIZONTAL_PAIR),
+], dtype=np.intp)
+_SEGMENT_START = EYE_SEGMENTS[:, :, 0].ravel()
+_SEGMENT_END = EYE_SEGMENTS[:, :, 1].ravel()
+# Indices que realmente se leen para los ojos; el resto del buffer no se toca
+EYE_LANDMARKS = np.unique(EYE_SEGMENTS).tolist()
+
+
+def new_landmark_buffer(num_landmarks: int = NUM_LANDMARKS) -> np.ndarray:
+    """Reserva el arreglo (N, 3) float32 que se reutiliza en cada frame."""
+    return np.zeros((num_landmarks, 3), dtype=np.float32)
+
+
+def landmarks_to_array(landmarks, width: int, height: int, out: np.ndarray, indices=None, origin=(0, 0)) -> np.ndarray:
+    """Copia landmarks normalizados a pixeles dentro de ``out`` en una sola pasada.
+
+    Las coordenadas (x, y, z) se escalan como antes: x y z por el ancho, y por
+    el alto. Con ``indices`` solo se convierten esas filas (conservando el
+    numero de landmark como fila), que es mucho mas barato que recorrer los
+    478 objetos de MediaPipe cuando solo interesan los ojos. Si los landmarks
+    vienen de un recorte, ``width``/``height`` son los del recorte y ``origin``
+    su esquina superior izquierda dentro del frame completo.
+    """
+    if indices is None:
+        indices = range(len(landmarks))
+    count = len(indices)
+    values = np.fromiter(
+        chain.from_iterable((landmarks[i].x, landmarks[i].y, landmarks[i].z) for i in indices),
+        dtype=np.float32,
+        count=3 * count,
+    ).reshape(count, 3)
+    values *= (width, height, width)
+    if origin[0] or origin[1]:
+        values += (origin[0], origin[1], 0)
+    if isinstance(indices, range):
+        out[:count] = values
+    else:
+        out[indices] = values
+    return out
+
+
+def eye_metrics(points: np.ndarray):
+    """Calcula EAR y relacion vertical de ambos ojos con un solo indexado.
+
+    ``points`` es (N, 3) para un rostro o (F, N, 3) para varios; devuelve dos
+    arreglos de forma (2,) o (F, 2) en orden (izquierdo, derecho).
+    """
+    diff = points[..., _SEGMENT_START, :] - points[..., _SEGMENT_END, :]  # (..., 14, 3)
+    lengths = np.sqrt(np.einsum("...ij,...ij->...i", diff, diff))
+    lengths = lengths.reshape(lengths.shape[:-1] + (2, 7))
+
+    ear = (lengths[..., 0] + lengths[..., 1]) / (2 * lengths[..., 2])
+
+    # Promedio de las dos distancias verticales mas cortas de cada ojo
+    vertical_pairs = lengths[..., 3:6]
+    vertical = (vertical_pairs.sum(axis=-1) - vertical_pairs.max(axis=-1)) / 2
+    horizontal = lengths[..., 6]
+    vertical_ratio = np.zeros(horizontal.shape, dtype=lengths.dtype)
+    np.divide(vertical, horizontal, out=vertical_ratio, where=horizontal >= 1e-5)
+    return ear, vertical_ratio
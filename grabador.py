@@ -0,0 +1,187 @@
+"""Grabacion de sesiones para ajustar umbrales sin volver a correr la camara.
+
+Una sesion es una carpeta con tres archivos:
+
+* ``metrics.bin``: registros binarios identicos a los que viajan por stdout
+  (``telemetria.RECORD_DTYPE``), uno por ocupante y frame analizado.
+* ``frames.bin``: por cada registro, el instante relativo al inicio de la
+  sesion y los landmarks de los ojos en float16 (``FRAME_DTYPE``). Se guardan como
+  desplazamiento desde el centro de los ojos, asi float16 conserva precision
+  de decimas de pixel.
+* ``meta.json``: version del esquema, indices de landmarks y hora de inicio.
+
+Ambos binarios son de ancho fijo y solo se agregan datos al final, por lo que
+``open_session()`` los abre con ``np.memmap`` sin cargarlos en memoria. Una
+grabacion nueva sobre una carpeta existente continua los tiempos donde
+quedaron (o desde ``started_at``), asi nunca van hacia atras. Con
+un rostro a 30 FPS son unos 19 MB por hora.
+"""
+import json
+import queue
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from geometria_ojos import EYE_LANDMARKS
+from instrumentacion import EMPTY_STATS, StageStats
+from telemetria import RECORD_DTYPE, SCHEMA_VERSION, pack_record
+
+SESSION_FORMAT = 1
+RECORDER_QUEUE_SIZE = 4096  # Registros pendientes antes de descartar (el bucle nunca espera)
+RECORDER_FLUSH_INTERVAL = 1.0  # Segundos entre cada flush de los archivos
+
+FRAME_DTYPE = np.dtype([
+    ("timestamp", "<f8"),  # Segundos desde el primer registro de la sesion
+    ("origin", "<f4", (2,)),  # Centro (x, y) de los ojos en pixeles
+    ("eye_points", "<f2", (len(EYE_LANDMARKS), 3)),  # EYE_LANDMARKS menos el origen
+])
+
+METRICS_FILE = "metrics.bin"
+FRAMES_FILE = "frames.bin"
+META_FILE = "meta.json"
+
+
+class SessionRecorder:
+    """Escribe la sesion desde un hilo propio; ``write()`` solo encola.
+
+    Si el disco no da abasto y la cola se llena, los registros se descartan y
+    se cuentan en ``dropped`` en lugar de frenar el bucle de frames.
+    """
+
+    def __init__(self, path: Path, stream_id: int = 0) -> None:
+        self.path = Path(path)
+        self.stream_id = int(stream_id)
+        self._queue: "queue.Queue" = queue.Queue(maxsize=RECORDER_QUEUE_SIZE)
+        self._thread: Optional[threading.Thread] = None
+        self._started: Optional[float] = None  # Primer timestamp recibido, en el reloj de quien llama
+        self._offset = 0.0  # Segundos de la sesion en que empieza esta grabacion
+        self.written = 0
+        self.dropped = 0
+
+    def start(self) -> "SessionRecorder":
+        if self._thread is not None:
+            return self
+        self.path.mkdir(parents=True, exist_ok=True)
+        meta_path = self.path / META_FILE
+        if meta_path.exists():
+            meta = json.loads(meta_path.read_text())
+            if meta.get("schema_version") != SCHEMA_VERSION or meta.get("eye_landmarks") != EYE_LANDMARKS:
+                raise ValueError(f"{self.path} tiene una sesion con otro formato")
+            # Se agrega a la sesion: el tiempo sigue desde su inicio real y nunca por debajo del ultimo registro
+            previous = _open_memmap(self.path / FRAMES_FILE, FRAME_DTYPE)
+            last = float(previous["timestamp"][-1]) if len(previous) else 0.0
+            elapsed = time.time() - float(meta["started_at"]) if "started_at" in meta else 0.0
+            self._offset = max(last, elapsed)
+        else:
+            meta_path.write_text(json.dumps({
+                "format": SESSION_FORMAT,
+                "schema_version": SCHEMA_VERSION,
+                "eye_landmarks": EYE_LANDMARKS,
+                "started_at": time.time(),
+            }, indent=2))
+        self._thread = threading.Thread(target=self._run, name="SessionRecorder", daemon=True)
+        self._thread.start()
+        return self
+
+    def write(self, frame: int, face, stats: StageStats = EMPTY_STATS, timestamp: Optional[float] = None) -> bool:
+        """Encola un ocupante (``detector.FaceState``); devuelve False si se descarto."""
+        timestamp = time.monotonic() if timestamp is None else timestamp
+        if self._started is None:
+            self._started = timestamp
+        # Se copian los landmarks de los ojos: el buffer del pipeline se reutiliza en el siguiente frame
+        eye_points = face.points[EYE_LANDMARKS]
+        record = pack_record(
+            frame, face.ear_raw, face.ear_metric, face.ear_smoothed, face.ear_threshold, face.eye_state,
+            face.closed_frames, stats, face.alert, face.face_id, face.pitch, face.head_state, self.stream_id,
+        )
+        try:
+            self._queue.put_nowait((record, timestamp - self._started + self._offset, eye_points))
+        except queue.Full:
+            self.dropped += 1
+            return False
+        return True
+
+    def _run(self) -> None:
+        with open(self.path / METRICS_FILE, "ab") as metrics, open(self.path / FRAMES_FILE, "ab") as frames:
+            next_flush = time.monotonic() + RECORDER_FLUSH_INTERVAL
+            running = True
+            while running:
+                try:
+                    batch = [self._queue.get(timeout=RECORDER_FLUSH_INTERVAL)]
+                except queue.Empty:
+                    batch = []
+                while True:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if batch and batch[-1] is None:
+                    batch.pop()
+                    running = False
+                if batch:
+                    try:
+                        self._write_batch(batch, metrics, frames)
+                    except OSError as exc:
+                        print(f"[WARN] Grabacion detenida: {exc}", file=sys.stderr)
+                        return
+                if not running or time.monotonic() >= next_flush:
+                    metrics.flush()
+                    frames.flush()
+                    next_flush = time.monotonic() + RECORDER_FLUSH_INTERVAL
+
+    def _write_batch(self, batch, metrics, frames) -> None:
+        rows = np.empty(len(batch), dtype=FRAME_DTYPE)
+        points = np.stack([eye_points for _, _, eye_points in batch])  # (B, K, 3)
+        origin = points[:, :, :2].mean(axis=1)
+        rows["timestamp"] = [timestamp for _, timestamp, _ in batch]
+        rows["origin"] = origin
+        points[:, :, :2] -= origin[:, None, :]
+        rows["eye_points"] = points
+        metrics.write(b"".join(record for record, _, _ in batch))
+        frames.write(rows.tobytes())
+        self.written += len(batch)
+
+    def stop(self) -> None:
+        """Escribe lo pendiente y cierra los archivos."""
+        if self._thread is None:
+            return
+        self._queue.put(None)  # Bloquea si la cola esta llena: al cerrar si se espera al disco
+        self._thread.join(timeout=10.0)
+        self._thread = None
+
+
+class Session(NamedTuple):
+    """Sesion abierta en solo lectura; ``metrics`` y ``frames`` son np.memmap alineados por fila."""
+    metrics: np.ndarray
+    frames: np.ndarray
+    meta: dict
+
+    def eye_points(self, rows=slice(None)) -> np.ndarray:
+        """Landmarks de los ojos en pixeles (float32) para las filas pedidas."""
+        frames = self.frames[rows]
+        points = frames["eye_points"].astype(np.float32)
+        points[..., :2] += frames["origin"][..., None, :]
+        return points
+
+
+def _open_memmap(path: Path, dtype: np.dtype) -> np.ndarray:
+    count = path.stat().st_size // dtype.itemsize if path.exists() else 0
+    if count == 0:
+        return np.empty(0, dtype=dtype)
+    # Si la grabacion se corto a mitad de un registro, la fila incompleta se ignora
+    return np.memmap(path, dtype=dtype, mode="r", shape=(count,))
+
+
+def open_session(path: Path) -> Session:
+    path = Path(path)
+    meta = json.loads((path / META_FILE).read_text())
+    if meta.get("schema_version") != SCHEMA_VERSION:
+        raise ValueError(f"Sesion con esquema {meta.get('schema_version')}, se esperaba {SCHEMA_VERSION}")
+    metrics = _open_memmap(path / METRICS_FILE, RECORD_DTYPE)
+    frames = _open_memmap(path / FRAMES_FILE, FRAME_DTYPE)
+    count = min(len(metrics), len(frames))
+    return Session(metrics[:count], frames[:count], meta)
@@ -1,50 +1,106 @@
+"""Grafica del EAR embebida en el panel de control.
+
+Solo las dos lineas se redibujan en cada refresco (blitting): ejes, marcas y
+leyenda se pintan una vez y se guardan como fondo. El redibujo completo
+ocurre unicamente al cambiar el tamaño del widget, cuando los datos salen
+del rango vertical actual o cuando ese rango quedo holgado de mas (los picos
+viejos ya salieron de la ventana).
+"""
+from typing import Optional
+
 import numpy as np
-import matplotlib.pyplot as plt
-
-# Objetos globales para reutilizar la ventana de Matplotlib entre invocaciones
-_figure = None
-_line_baseline = None
-_line_actual = None
-
-
-def grafica(ear_baseline_values, ear_values):
-    """Muestra/actualiza la grafica con el EAR actual y su umbral."""
-    global _figure, _line_baseline, _line_actual
-
-    if not ear_baseline_values or not ear_values:
-        return None
-
-    length = min(len(ear_baseline_values), len(ear_values))
-    if length == 0:
-        return None
-
-    xs = np.arange(length)
-    baseline = np.array(ear_baseline_values[-length:])
-    actual = np.array(ear_values[-length:])
-
-    if _figure is None or _line_baseline is None or _line_actual is None:
-        plt.style.use("ggplot")
-        plt.ion()
-        _figure, ax = plt.subplots()
-        _line_baseline, = ax.plot(xs, baseline, "b-", label="Umbral ")
-        _line_actual, = ax.plot(xs, actual, "r-", label="EAR Actual")
-        ax.set_ylabel("EAR Value", fontsize=18)
-        ax.set_xlim(0, max(xs[-1], 1))
-        ax.legend()
-    else:
-        ax = _line_baseline.axes
-        _line_baseline.set_data(xs, baseline)
-        _line_actual.set_data(xs, actual)
-        ax.set_xlim(0, max(xs[-1], 1))
-
-    ymin = min(baseline.min(), actual.min())
-    ymax = max(baseline.max(), actual.max())
-    if ymin != ymax:
-        padding = max((ymax - ymin) * 0.1, 0.01)
-        ax = _line_baseline.axes
-        ax.set_ylim(ymin - padding, ymax + padding)
-
-    _figure.canvas.draw()
-    _figure.canvas.flush_events()
-    return _line_baseline, _line_actual
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg
+from matplotlib.figure import Figure
+
+INITIAL_Y_RANGE = (0.15, 0.35)  # Rango tipico del EAR antes de recibir datos
+Y_PADDING = 0.02  # Margen extra al ampliar el eje Y, para no reescalar con cada pico
+Y_SHRINK_SLACK = 0.05  # Holgura sobre el margen a partir de la cual el eje Y se vuelve a ajustar
+
+
+class GraficaEAR(FigureCanvasQTAgg):
+    """Widget Qt con el EAR suavizado y su umbral sobre una ventana fija de muestras."""
+
+    def __init__(self, capacity: int, theme: Optional[dict] = None, parent=None) -> None:
+        theme = theme or {}
+        self.figure = Figure(figsize=(6, 2.4), tight_layout=True)
+        super().__init__(self.figure)
+        self.setParent(parent)
+        self.capacity = int(capacity)
+        self._xs = np.arange(self.capacity)
+
+        background = theme.get("card", "white")
+        text = theme.get("text", "black")
+        self.figure.set_facecolor(background)
+        self.ax = self.figure.add_subplot()
+        self.ax.set_facecolor(background)
+        self.ax.tick_params(colors=theme.get("muted_text", text))
+        for spine in self.ax.spines.values():
+            spine.set_color(theme.get("border", text))
+        self.ax.set_ylabel("EAR", color=text)
+        self.ax.set_xlim(0, self.capacity - 1)
+        self.ax.set_ylim(*INITIAL_Y_RANGE)
+
+        # animated=True las deja fuera del dibujo completo; se pintan encima del fondo guardado
+        self._line_baseline, = self.ax.plot([], [], "b-", label="Umbral", animated=True)
+        self._line_actual, = self.ax.plot([], [], "r-", label="EAR Actual", animated=True)
+        self.ax.legend(loc="upper left", fontsize=8)
+
+        self._background = None
+        self.redraws = 0  # Redibujos completos (reescalado o cambio de tamaño)
+        self.mpl_connect("draw_event", self._on_draw)
+
+    def _on_draw(self, event) -> None:
+        self._background = self.copy_from_bbox(self.ax.bbox)
+        self._draw_lines()
+
+    def _draw_lines(self) -> None:
+        self.ax.draw_artist(self._line_baseline)
+        self.ax.draw_artist(self._line_actual)
+
+    def _ajustar_rango(self, ymin: float, ymax: float) -> bool:
+        """Ajusta el eje Y si los datos salieron del rango actual o si este sobra por mucho."""
+        low, high = self.ax.get_ylim()
+        inside = ymin >= low and ymax <= high
+        loose = low < ymin - Y_PADDING - Y_SHRINK_SLACK or high > ymax + Y_PADDING + Y_SHRINK_SLACK
+        if inside and not loose:
+            return False
+        self.ax.set_ylim(ymin - Y_PADDING, ymax + Y_PADDING)
+        return True
+
+    def actualizar(self, baseline, actual, y_range=None) -> None:
+        """Pinta las series (p. ej. ``SerieCircular.view()``); no hace nada si no esta visible.
+
+        ``y_range`` es el (minimo, maximo) de los datos si ya se conoce (``SerieCircular.minmax()``);
+        sin el, se calcula recorriendo las series.
+        """
+        if not self.isVisible() or self.window().isMinimized():
+            return
+        length = min(len(baseline), len(actual))
+        if length == 0:
+            return
+        xs = self._xs[:length]
+        baseline = np.asarray(baseline)[-length:]
+        actual = np.asarray(actual)[-length:]
+        self._line_baseline.set_data(xs, baseline)
+        self._line_actual.set_data(xs, actual)
+
+        if y_range is None:
+            y_range = (min(baseline.min(), actual.min()), max(baseline.max(), actual.max()))
+        ymin, ymax = y_range
+        if self._background is None or self._ajustar_rango(ymin, ymax):
+            # El dibujo completo dispara draw_event, que guarda el nuevo fondo y pinta las lineas
+            self.redraws += 1
+            self.draw()
+            return
+        self.restore_region(self._background)
+        self._draw_lines()
+        self.blit(self.ax.bbox)
 
+    def limpiar(self) -> None:
+        """Vacia las lineas y vuelve al rango vertical inicial para una nueva sesion."""
+        self._line_baseline.set_data([], [])
+        self._line_actual.set_data([], [])
+        self.ax.set_ylim(*INITIAL_Y_RANGE)
+        self._background = None
+        if self.isVisible():
+            self.draw()
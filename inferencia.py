@@ -0,0 +1,190 @@
+import cv2
+import numpy as np
+from typing import List, NamedTuple, Optional, Tuple
+
+from geometria_ojos import EYE_LANDMARKS, NUM_LANDMARKS, landmarks_to_array
+from instrumentacion import NULL_TIMER, now
+from memoria import BufferPool
+from pose_cabeza import POSE_LANDMARKS
+
+DETECTION_SANITY_INTERVAL = 90  # Frames con rostro entre cada verificacion con FaceDetection
+DETECTION_ROI_PADDING = 0.6  # Margen agregado a la caja de FaceDetection (fraccion del lado)
+ROI_PADDING = 0.35  # Margen agregado al contorno del rostro del frame anterior
+ROI_MIN_SIZE = 64  # Lado minimo del recorte en pixeles del frame completo
+INFERENCE_SIZE = 256  # Lado mayor del recorte que recibe FaceMesh (por rostro)
+MAX_FACES = 1  # Rostros que sigue FaceMesh; mas de uno para conductor y copiloto
+
+# Contorno del rostro en la malla de MediaPipe, usado para seguir el recorte
+FACE_OVAL = [
+    10, 338, 297, 332, 284, 251, 389, 356, 454, 323, 361, 288,
+    397, 365, 379, 378, 400, 377, 152, 148, 176, 149, 150, 136,
+    172, 58, 132, 93, 234, 127, 162, 21, 54, 103, 67, 109,
+]
+TRACKED_LANDMARKS = sorted(set(EYE_LANDMARKS) | set(FACE_OVAL) | set(POSE_LANDMARKS))
+
+
+class MeshResult(NamedTuple):
+    """Rostros encontrados por FaceMesh, ya en pixeles del frame completo."""
+    faces: List[np.ndarray]  # Un arreglo (N, 3) por rostro; solo TRACKED_LANDMARKS estan al dia
+    roi: Optional[Tuple[int, int, int, int]]  # Recorte usado, None si fue el frame completo
+    landmarks: np.ndarray  # Los mismos rostros apilados (F, N, 3), para calculos vectorizados
+
+
+class DetectionScheduler:
+    """Decide cuando vale la pena correr FaceDetection.
+
+    El detector solo corre cuando FaceMesh perdio el rostro o, con rostro
+    presente, cada ``sanity_interval`` frames como verificacion.
+    """
+
+    def __init__(self, sanity_interval: int = DETECTION_SANITY_INTERVAL) -> None:
+        self.sanity_interval = max(1, int(sanity_interval))
+        self.face_tracked = False
+        self.frames_since_detection = 0
+        self.mesh_runs = 0
+        self.detection_runs = 0
+
+    def should_detect(self) -> bool:
+        return not self.face_tracked or self.frames_since_detection >= self.sanity_interval
+
+    def record_detection(self, found: bool) -> None:
+        self.detection_runs += 1
+        self.frames_since_detection = 0
+        if not found:
+            # El detector no ve rostro: se fuerza reacquisicion en los siguientes frames
+            self.face_tracked = False
+
+    def record_mesh(self, found: bool) -> None:
+        self.mesh_runs += 1
+        self.frames_since_detection += 1
+        self.face_tracked = found
+
+
+def clamp_square_roi(cx: float, cy: float, side: float, width: int, height: int):
+    """Recorte cuadrado centrado en (cx, cy) y recortado a los bordes del frame."""
+    side = max(side, ROI_MIN_SIZE)
+    x0 = int(max(0, cx - side / 2))
+    y0 = int(max(0, cy - side / 2))
+    x1 = int(min(width, cx + side / 2))
+    y1 = int(min(height, cy + side / 2))
+    if x1 - x0 < 2 or y1 - y0 < 2:
+        return None
+    return x0, y0, x1, y1
+
+
+def detection_roi(detection, width: int, height: int, padding: float = DETECTION_ROI_PADDING):
+    """Convierte la caja relativa de FaceDetection en un recorte cuadrado con margen."""
+    box = detection.location_data.relative_bounding_box
+    side = max(box.width * width, box.height * height) * (1 + padding)
+    cx = (box.xmin + box.width / 2) * width
+    cy = (box.ymin + box.height / 2) * height
+    return clamp_square_roi(cx, cy, side, width, height)
+
+
+def union_roi(rois):
+    """Rectangulo que cubre todos los recortes dados (None si no hay ninguno)."""
+    rois = [roi for roi in rois if roi is not None]
+    if not rois:
+        return None
+    x0s, y0s, x1s, y1s = zip(*rois)
+    return min(x0s), min(y0s), max(x1s), max(y1s)
+
+
+def landmarks_roi(points: np.ndarray, width: int, height: int, padding: float = ROI_PADDING):
+    """Recorte para el siguiente frame a partir del contorno del rostro actual."""
+    oval = points[FACE_OVAL, :2]
+    x_min, y_min = oval.min(axis=0)
+    x_max, y_max = oval.max(axis=0)
+    side = max(x_max - x_min, y_max - y_min) * (1 + padding)
+    return clamp_square_roi((x_min + x_max) / 2, (y_min + y_max) / 2, side, width, height)
+
+
+class FacePipeline:
+    """Ejecuta FaceMesh sobre un recorte reducido que sigue al rostro.
+
+    El recorte sale de los landmarks del frame anterior y se reduce a
+    ``inference_size`` antes de FaceMesh. Cuando se pierde el rostro, corre
+    FaceDetection (solo entonces, o cada cierto tiempo como verificacion) para
+    sembrar un nuevo recorte; si tampoco encuentra nada, FaceMesh recibe el
+    frame completo. Con ``max_faces`` > 1 el recorte cubre a todos los rostros
+    seguidos y la verificacion periodica lo amplia si aparece alguien mas.
+    """
+
+    def __init__(self, face_mesh, face_detection, scheduler: Optional[DetectionScheduler] = None,
+                 inference_size: int = INFERENCE_SIZE, timer=NULL_TIMER, max_faces: int = MAX_FACES,
+                 buffers: Optional[BufferPool] = None) -> None:
+        self.face_mesh = face_mesh
+        self.face_detection = face_detection
+        self.scheduler = scheduler if scheduler is not None else DetectionScheduler()
+        self.inference_size = int(inference_size)
+        self.max_faces = max(1, int(max_faces))
+        self.roi = None  # (x0, y0, x1, y1) para el proximo frame
+        self.roi_faces = 0  # Rostros dentro del recorte; escala el tamaño de inferencia
+        self.timer = timer
+        self._buffers = np.zeros((self.max_faces, NUM_LANDMARKS, 3), dtype=np.float32)
+        self.buffers = buffers if buffers is not None else BufferPool()  # Destino del recorte reducido
+
+    def process(self, frame_rgb: np.ndarray) -> MeshResult:
+        height, width = frame_rgb.shape[:2]
+        timer = self.timer
+        if self.scheduler.should_detect():
+            started = now()
+            detections = self.face_detection.process(frame_rgb).detections
+            timer.record("facedetection", now() - started)
+            self.scheduler.record_detection(bool(detections))
+            if not detections:
+                self.roi = None
+            elif self.roi is None or self.roi_faces < min(len(detections), self.max_faces):
+                best = sorted(detections, key=lambda det: det.score[0] if det.score else 0.0, reverse=True)
+                best = best[:self.max_faces]
+                self.roi = union_roi([self.roi] + [detection_roi(det, width, height) for det in best])
+                self.roi_faces = len(best)
+
+        started = now()
+        roi = self.roi
+        if roi is not None:
+            x0, y0, x1, y1 = roi
+            crop = frame_rgb[y0:y1, x0:x1]
+            crop_height, crop_width = crop.shape[:2]
+            scale = self.inference_size * max(1, self.roi_faces) / max(crop_width, crop_height)
+            if scale < 1.0:
+                size = (max(1, round(crop_width * scale)), max(1, round(crop_height * scale)))
+                dst = self.buffers.take("roi", (size[1], size[0]) + crop.shape[2:])
+                image = self.buffers.confirm("roi", dst, cv2.resize(crop, size, dst=dst,
+                                                                    interpolation=cv2.INTER_AREA))
+            else:
+                # FaceMesh necesita el recorte contiguo; se copia al mismo buffer en lugar de uno nuevo
+                image = self.buffers.take("roi", crop.shape)
+                np.copyto(image, crop)
+            origin = (x0, y0)
+        else:
+            image = frame_rgb
+            crop_width, crop_height = width, height
+            origin = (0, 0)
+
+        timer.record("roi", now() - started)
+
+        started = now()
+        results = self.face_mesh.process(image)
+        timer.record("facemesh", now() - started)
+        found = results.multi_face_landmarks is not None
+        self.scheduler.record_mesh(found)
+        if not found:
+            self.roi = None
+            self.roi_faces = 0
+            return MeshResult([], roi, self._buffers[:0])
+
+        faces = []
+        for face_landmarks, buffer in zip(results.multi_face_landmarks, self._buffers):
+            # Las coordenadas normalizadas del recorte reducido valen igual para el recorte original
+            faces.append(landmarks_to_array(
+                face_landmarks.landmark,
+                crop_width,
+                crop_height,
+                buffer,
+                TRACKED_LANDMARKS,
+                origin=origin,
+            ))
+        self.roi = union_roi([landmarks_roi(points, width, height) for points in faces])
+        self.roi_faces = len(faces)
+        return MeshResult(faces, roi, self._buffers[:len(faces)])
@@ -0,0 +1,131 @@
+import time
+from collections import defaultdict
+from typing import Dict, List, NamedTuple
+
+import numpy as np
+
+# Etapas del pipeline en el orden en que ocurren dentro de un frame
+STAGES = (
+    "capture",
+    "flip",
+    "cvtcolor",
+    "facedetection",
+    "roi",
+    "facemesh",
+    "ear",
+    "pose",
+    "overlay",
+    "display",
+    "inference",  # Todo detector.process(): cvtColor, modelos y EAR
+)
+STATS_WINDOW = 240  # Muestras por etapa en la ventana movil (~4 s a 60 FPS)
+STATS_INTERVAL = 1.0  # Segundos entre cada resumen emitido con las metricas
+
+now = time.perf_counter  # Reloj monotono de alta resolucion para todas las etapas
+
+
+class StageTimer:
+    """Acumula la duracion (en segundos) de cada etapa del pipeline."""
+
+    enabled = True
+
+    def __init__(self) -> None:
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+
+    def record(self, stage: str, seconds: float) -> None:
+        self.samples[stage].append(seconds)
+
+    def clear(self) -> None:
+        self.samples.clear()
+
+
+class NullTimer:
+    """Timer que no guarda nada; es el predeterminado fuera de las mediciones."""
+
+    enabled = False
+
+    def record(self, stage: str, seconds: float) -> None:
+        pass
+
+
+NULL_TIMER = NullTimer()
+
+
+class StageStats(NamedTuple):
+    """Resumen periodico que viaja junto con las metricas de cada frame."""
+    fps: float
+    inference_ms: float  # Mediana de detector.process() en la ventana
+    dropped_frames: int
+    stages: Dict[str, tuple]  # etapa -> (p50_ms, p95_ms)
+    inference_fps: float = 0.0  # Veces por segundo que corrio el detector (menor que fps si se salta frames)
+
+
+EMPTY_STATS = StageStats(0.0, 0.0, 0, {})
+
+
+class RollingStageTimer:
+    """Timer en vivo: conserva las ultimas ``window`` muestras de cada etapa.
+
+    Cada etapa usa un arreglo preasignado como anillo, asi ``record()`` cuesta
+    una asignacion y el bucle de frames no crece en memoria. ``snapshot()``
+    calcula percentiles sobre la ventana y se llama solo cada tanto.
+    """
+
+    enabled = True
+
+    def __init__(self, window: int = STATS_WINDOW) -> None:
+        self.window = int(window)
+        self._samples: Dict[str, np.ndarray] = {}
+        self._counts: Dict[str, int] = {}
+        self._ticks = np.zeros(self.window, dtype=np.float64)
+        self._tick_count = 0
+        self._last_snapshot = now()
+        self._last_inference_count = 0
+
+    def record(self, stage: str, seconds: float) -> None:
+        samples = self._samples.get(stage)
+        if samples is None:
+            samples = self._samples[stage] = np.zeros(self.window, dtype=np.float64)
+            self._counts[stage] = 0
+        count = self._counts[stage]
+        samples[count % self.window] = seconds
+        self._counts[stage] = count + 1
+
+    def tick(self) -> None:
+        """Marca el fin de un frame para calcular los FPS reales."""
+        self._ticks[self._tick_count % self.window] = now()
+        self._tick_count += 1
+
+    def reset(self) -> None:
+        """Descarta lo medido, p. ej. al reanudar tras una pausa; los anillos se reutilizan."""
+        for stage in self._counts:
+            self._counts[stage] = 0
+        self._tick_count = 0
+        self._last_snapshot = now()
+        self._last_inference_count = 0
+
+    def fps(self) -> float:
+        filled = min(self._tick_count, self.window)
+        if filled < 2:
+            return 0.0
+        last = self._ticks[(self._tick_count - 1) % self.window]
+        first = self._ticks[(self._tick_count - filled) % self.window]
+        return (filled - 1) / (last - first) if last > first else 0.0
+
+    def snapshot(self, dropped_frames: int = 0) -> StageStats:
+        stages = {}
+        for stage, samples in self._samples.items():
+            if not self._counts[stage]:
+                continue  # Etapa sin muestras desde reset()
+            filled = samples[:min(self._counts[stage], self.window)]
+            p50, p95 = np.percentile(filled, [50, 95]) * 1000.0
+            stages[stage] = (float(p50), float(p95))
+        inference_ms = stages.get("inference", (0.0, 0.0))[0]
+        # Tasa efectiva del detector desde el resumen anterior
+        current = now()
+        inference_count = self._counts.get("inference", 0)
+        elapsed = current - self._last_snapshot
+        inference_fps = (inference_count - self._last_inference_count) / elapsed if elapsed > 0 else 0.0
+        self._last_snapshot = current
+        self._last_inference_count = inference_count
+        return StageStats(self.fps(), inference_ms, int(dropped_frames), stages, inference_fps)
@@ -1,8 +1,15 @@
+import re
 import sys
 import json
-from typing import Optional, List
+import time
+from typing import Dict, Optional, List
 from pathlib import Path
-from graficas import grafica
+import numpy as np
+from graficas import GraficaEAR
+from control_estado import REVISION_PREFIX, write_control_state_file
+from serie_circular import SerieCircular
+from telemetria import MetricsDecoder, record_to_dict
+from servicio import SERVICE_PREFIX
 
 from PyQt5.QtWidgets import (
     QApplication,
@@ -20,13 +27,19 @@ from PyQt5.QtWidgets import (
 from PyQt5.QtCore import Qt, QProcess, QPoint, QTimer
 from PyQt5.QtGui import QColor
 
+CONTROL_CHARS = re.compile(r"[\x00-\x08\x0b-\x1f\x7f]")  # Bytes de control (p. ej. la campana) en stderr
+SUPERVISOR_QUIT_TIMEOUT_MS = 5000  # Espera a que supervisor.py cierre sus fuentes antes de terminate/kill
 LOG_INTERVAL_FRAMES = 12  # Cada cuantos frames escribimos un resumen en el log
 CONTROL_FILE = Path(__file__).with_name("control_state.json")  # Archivo compartido con el detector
+CONTROL_WRITE_DEBOUNCE_MS = 150  # Los cambios seguidos (p. ej. arrastrar un slider) se guardan juntos
+UI_REFRESH_MS = 66  # Etiquetas, log y grafica se repintan a ~15 Hz, no por cada metrica
+EAR_HISTORY_SAMPLES = 3600  # Muestras de EAR que conserva la grafica (~1 min a 60 FPS)
 # Estado inicial que sincroniza overlays y ajustes con angulo.py
 
 
 #configuracion predefinida si no logra leer el archivo json-----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 DEFAULT_CONTROL_STATE = {
+    "revision": 0,
     "recalibrate_token": 0,
     "overlays": {
         "geometry": True,
@@ -56,16 +69,40 @@ THEMES = {
 }
 # Ventana principal del panel docente que controla angulo.py y visualiza metricas
 class VentanaPrincipal(QWidget):
-    def __init__(self) -> None:
+    def __init__(self, history_length: int = EAR_HISTORY_SAMPLES,
+                 write_debounce_ms: int = CONTROL_WRITE_DEBOUNCE_MS,
+                 sources: Optional[List[str]] = None) -> None:
         """Inicializa estados, buffers y lanza la construccion de la interfaz"""
         super().__init__()
-        self.ear_series: List[float] = []  # Serie temporal de EAR para graficar
-        self.ear_baseline_series: List[float] = []  # Serie temporal de EAR baseline para graficar
-        self.timer_grafica = QTimer(self)
-        self.timer_grafica.setInterval(100)
-        self.timer_grafica.timeout.connect(self._refrescar_grafica)
+        self.sources = list(sources or [])  # Con videos o varias fuentes se lanza supervisor.py
+        self.streams: Dict[int, dict] = {}  # Ultimas metricas de cada fuente
+        self.stream_grafica = 0  # Fuente cuyas series se grafican
+        self._frame_graficado: Optional[int] = None  # Ultimo frame graficado; un punto por frame
+        self.revisiones_aplicadas: Dict[int, int] = {}  # Revision del archivo de control que confirmo cada fuente
+        self.ear_series = SerieCircular(history_length)  # Serie temporal de EAR para graficar
+        self.ear_baseline_series = SerieCircular(history_length)  # Serie temporal de EAR baseline para graficar
+        self._series_nuevas = False  # Hay muestras sin pintar desde el ultimo refresco
+        self._pendientes: Dict[int, object] = {}  # Ultimo registro (o dict JSON) de cada fuente sin mostrar
+        self._ultimo_pendiente = None  # Registro mas reciente de cualquier fuente
+        self._muestras_pendientes = 0  # Metricas recibidas desde el ultimo refresco
+        self.refrescos_ui = 0  # Refrescos que repintaron el resumen
+        self.actualizaciones_fusionadas = 0  # Metricas que nunca se mostraron por llegar otra antes del refresco
+        self.timer_ui = QTimer(self)  # Unico refresco de la presentacion; la lectura solo acumula
+        self.timer_ui.setInterval(UI_REFRESH_MS)
+        self.timer_ui.timeout.connect(self._refrescar_ui)
+        self.timer_ui.start()
+        self.timer_guardado = QTimer(self)  # Agrupa escrituras del archivo de control
+        self.timer_guardado.setSingleShot(True)
+        self.timer_guardado.setInterval(write_debounce_ms)
+        self.timer_guardado.timeout.connect(self.flush_control_state)
         self.proceso: Optional[QProcess] = None  # Handler del proceso lanzado
-        self.stdout_buffer = ""  # Buffer para reconstruir lineas parciales
+        self.detectando = False  # Con el servicio, el proceso sigue vivo aunque la deteccion este en pausa
+        self._stderr_pendiente = ""  # Linea de stderr aun incompleta
+        self._pausas_pedidas = 0  # "pause" enviados cuyo aviso aun no llega; el resto viene de 'Esc'
+        self._start_pendiente = False  # "start" que se enviara cuando el proceso termine de arrancar
+        self._inicio_pedido: Optional[float] = None  # perf_counter() al pulsar Iniciar, hasta la primera metrica
+        self.tiempo_primera_metrica: Optional[float] = None  # Segundos de Iniciar a la primera metrica
+        self.metrics_decoder = MetricsDecoder()  # Reconstruye registros binarios y lineas parciales
         self.control_state = self.ensure_control_state()  # Preferencias leidas de control_state.json
         self.last_logged_frame = -LOG_INTERVAL_FRAMES  # Frame usado para muestrear logs
         settings = self.control_state.get("settings", {})  # Preferencias personalizadas del usuario
@@ -117,6 +154,11 @@ class VentanaPrincipal(QWidget):
         self.boton_grafica = QPushButton("Mostrar grafica")
         self.boton_grafica.clicked.connect(self.mostrar_grafica)
 
+        # Grafica embebida; oculta hasta que se pide y sin refrescos mientras lo este
+        self.grafica = GraficaEAR(self.ear_series.capacity, theme=THEMES[self.theme_name])
+        self.grafica.setMinimumHeight(220)
+        self.grafica.hide()
+
         self.boton_iniciar = QPushButton("Iniciar")
         self.boton_iniciar.setObjectName("iniciar")
         self.boton_iniciar.clicked.connect(self.iniciar_script)
@@ -140,12 +182,15 @@ class VentanaPrincipal(QWidget):
         card_layout.addWidget(self.status_label)
         card_layout.addWidget(overlays_panel)
         card_layout.addWidget(settings_panel)
+        card_layout.addWidget(self.grafica)
         card_layout.addStretch(1)
         card_layout.addLayout(botones_layout)
 
         root_layout.addWidget(card)
 
         self.refresh_theme()
+        # Carga MediaPipe y abre la camara de antemano; el primer Iniciar ya encuentra el detector listo
+        QTimer.singleShot(0, self.precargar_detector)
 
     def _build_overlay_panel(self) -> QGroupBox:
         """Prepara controles de overlays dentro de un panel compacto."""
@@ -245,14 +290,14 @@ class VentanaPrincipal(QWidget):
     def ensure_control_state(self) -> dict:
         """Valida o crea el archivo JSON con overlays y settings""" # ESTE METODO SE ENCARGA DE CREAR EL ARCHIVO JSON DE CONFIGURACION SI NO EXISTE Y VALIDAR SU CONTENIDO EL ARCHIVO JSON SE ENCARGA DE ALMACENAR LAS PREFERENCIAS DEL USUARIO
         if not CONTROL_FILE.exists():
-            CONTROL_FILE.write_text(json.dumps(DEFAULT_CONTROL_STATE, indent=2))
+            write_control_state_file(DEFAULT_CONTROL_STATE, CONTROL_FILE)
             return json.loads(CONTROL_FILE.read_text())
         try:
             data = json.loads(CONTROL_FILE.read_text())
             if not isinstance(data, dict):
                 raise ValueError
         except Exception:
-            CONTROL_FILE.write_text(json.dumps(DEFAULT_CONTROL_STATE, indent=2))
+            write_control_state_file(DEFAULT_CONTROL_STATE, CONTROL_FILE)
             return json.loads(CONTROL_FILE.read_text())
 
         overlays = data.get("overlays")
@@ -274,6 +319,7 @@ class VentanaPrincipal(QWidget):
             settings.pop("theme", None)
 
         data.setdefault("recalibrate_token", 0)
+        data.setdefault("revision", 0)
         return data
 
 #FIN DE CREACION Y VALIDACION DE ARCHIVO JSON DE CONFIGURACION------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
@@ -412,8 +458,21 @@ class VentanaPrincipal(QWidget):
         self.setStyleSheet(self.build_stylesheet())
 
     def write_control_state(self) -> None:
-        """Persiste el estado de UI en el archivo compartido"""
-        CONTROL_FILE.write_text(json.dumps(self.control_state, indent=2))
+        """Programa la escritura del estado; los cambios dentro de la ventana de debounce se guardan juntos"""
+        self.timer_guardado.start()  # Reinicia la cuenta si ya estaba pendiente
+
+    def flush_control_state(self) -> None:
+        """Persiste de inmediato el estado de UI con una revision nueva y escritura atomica"""
+        self.timer_guardado.stop()
+        try:
+            revision = int(self.control_state.get("revision", 0))
+        except (TypeError, ValueError):
+            revision = 0
+        self.control_state["revision"] = revision + 1
+        try:
+            write_control_state_file(self.control_state, CONTROL_FILE)
+        except OSError as exc:
+            self.append_line(f"[WARN] No se pudo guardar {CONTROL_FILE.name}: {exc}")
 
     def on_ear_ratio_changed(self, value: int) -> None:
         """Actualiza el ratio dinamico del EAR y guarda preferencia"""
@@ -440,46 +499,141 @@ class VentanaPrincipal(QWidget):
         self.control_state.setdefault('settings', DEFAULT_CONTROL_STATE['settings'].copy())['visual_alert'] = bool(enabled)
         self.write_control_state()
 
-    def iniciar_script(self) -> None:
-        """Lanza angulo.py via QProcess y prepara la interfaz"""
-        if self.proceso is None:
-            self.proceso = QProcess(self)
-        elif self.proceso.state() != QProcess.NotRunning:
-            return
-
-        self.reset_metrics()
+    def usa_servicio(self) -> bool:
+        """Con una sola camara angulo.py queda vivo en modo servicio; supervisor.py se relanza"""
+        # angulo.py solo abre camaras: un video, aunque sea la unica fuente, va a supervisor.py
+        return not self.sources or (len(self.sources) == 1 and self.sources[0].isdigit())
 
+    def _lanzar_proceso(self) -> None:
+        self.proceso = QProcess(self)
         self.proceso.setProgram(sys.executable)
-        self.proceso.setArguments(["-u", "angulo.py"])
+        self.proceso.setArguments(self._argumentos_detector())
         self.proceso.readyReadStandardOutput.connect(self.leer_stdout)
         self.proceso.readyReadStandardError.connect(self.leer_stderr)
-        self.proceso.started.connect(lambda: self.append_line("[INFO] angulo.py iniciado"))
+        self.proceso.started.connect(self._proceso_iniciado)
         self.proceso.finished.connect(self.proceso_termino)
-
         self.proceso.start()
+
+    def _proceso_iniciado(self) -> None:
+        self.append_line("[INFO] angulo.py iniciado")
+        if self._start_pendiente:
+            self._start_pendiente = False
+            self.proceso.write(b"start\n")
+
+    def precargar_detector(self) -> None:
+        """Lanza el servicio en pausa para que Iniciar no espere la carga de modelos"""
+        if self.usa_servicio() and self.proceso is None:
+            self._lanzar_proceso()
+            self.status_label.setText("Cargando detector...")
+
+    def iniciar_script(self) -> None:
+        """Reanuda el servicio (o lanza el proceso) y prepara la interfaz"""
+        if self.detectando:
+            return
+
+        self.reset_metrics()
+        if self.timer_guardado.isActive():
+            self.flush_control_state()  # El detector debe arrancar con los ultimos ajustes
+
+        self._inicio_pedido = time.perf_counter()
+        if self.proceso is None:
+            self._lanzar_proceso()
+        if self.usa_servicio():
+            # Si el servicio aun carga modelos, el comando espera en su stdin
+            if self.proceso.state() == QProcess.Running:
+                self.proceso.write(b"start\n")
+            else:
+                # Todavia arrancando: se envia al emitir started, sin bloquear la interfaz
+                self._start_pendiente = True
+        self.detectando = True
         self.status_label.setText("Iniciando deteccion...")
         self.boton_iniciar.setEnabled(False)
         self.boton_detener.setEnabled(True)
 
+    def _argumentos_detector(self) -> List[str]:
+        """angulo.py para una camara; supervisor.py para videos o varias fuentes"""
+        if not self.usa_servicio():
+            argumentos = ["-u", "supervisor.py", "--service"]
+            for source in self.sources:
+                argumentos += ["--source", source]
+            return argumentos
+        argumentos = ["-u", "angulo.py", "--service"]
+        if self.sources:
+            argumentos += ["--camera", self.sources[0]]
+        return argumentos
+
     def leer_stdout(self) -> None:
-        """Procesa la salida estandar JSON proveniente de angulo.py"""
+        """Decodifica en bloque los registros binarios (o lineas JSON) de angulo.py"""
         if not self.proceso:
             return
-        texto = bytes(self.proceso.readAllStandardOutput()).decode(errors="replace")
-        if not texto:
+        datos = bytes(self.proceso.readAllStandardOutput())
+        if not datos:
             return
-        self.stdout_buffer += texto
-        while "\n" in self.stdout_buffer:
-            line, self.stdout_buffer = self.stdout_buffer.split("\n", 1)
+        registros, lineas = self.metrics_decoder.feed(datos)
+        for line in lineas:
             self.procesar_linea_stdout(line.strip())
+        if len(registros):
+            self.procesar_registros(registros)
+
+    def procesar_registros(self, registros) -> None:
+        """Agrega en bloque los registros binarios; el resumen lo pinta el siguiente refresco"""
+        self._registrar_primera_metrica()
+        stream_ids = registros["stream_id"]
+        grafica = registros[stream_ids == self.stream_grafica]
+        if len(grafica):
+            # Con varios ocupantes se grafica el principal: el primer registro de cada frame (menor face_id)
+            frames = grafica["frame"].astype(np.int64)
+            previo = self._frame_graficado if self._frame_graficado is not None else -1
+            grafica = grafica[np.diff(frames, prepend=previo) != 0]
+            self._frame_graficado = int(frames[-1])
+        self._agregar_series(grafica["ear_smoothed"], grafica["ear_threshold"])
+        # Ultimo registro de cada fuente presente en el bloque; se convierte a dict al refrescar
+        ids, ultimos = np.unique(stream_ids[::-1], return_index=True)
+        for stream_id, indice in zip(ids.tolist(), ultimos.tolist()):
+            self._pendientes[stream_id] = registros[len(registros) - 1 - indice].copy()
+        self._ultimo_pendiente = self._pendientes[int(stream_ids[-1])]
+        self._muestras_pendientes += len(registros)
 
     def leer_stderr(self) -> None:
         """Muestra logs de error del proceso monitorizado"""
         if not self.proceso:
             return
-        texto = bytes(self.proceso.readAllStandardError()).decode(errors="replace")
-        if texto:
-            print(texto, end="")
+        texto = self._stderr_pendiente + bytes(self.proceso.readAllStandardError()).decode(errors="replace")
+        *lineas, self._stderr_pendiente = texto.split("\n")
+        for linea in lineas:
+            # Un byte de control pegado al inicio no debe ocultar un aviso del protocolo
+            linea = CONTROL_CHARS.sub("", linea)
+            if linea.startswith(SERVICE_PREFIX):
+                self.estado_servicio(linea[len(SERVICE_PREFIX):].strip())
+            elif linea.startswith(REVISION_PREFIX):
+                self.revision_aplicada(linea[len(REVISION_PREFIX):])
+            else:
+                print(linea)
+
+    def estado_servicio(self, estado: str) -> None:
+        """Avisos del detector en modo servicio: listo, corriendo o en pausa"""
+        if estado == "ready":
+            self.append_line("[INFO] Detector listo")
+            if not self.detectando:
+                self.status_label.setText("Detector listo, presiona iniciar")
+        elif estado == "paused":
+            if self._pausas_pedidas:
+                self._pausas_pedidas -= 1  # Confirmacion de un Detener; puede llegar despues de otro Iniciar
+            elif self.detectando:
+                # Se pauso desde la ventana de video ('Esc')
+                self._marcar_detenido("Deteccion en pausa")
+
+    def revision_aplicada(self, texto: str) -> None:
+        """El detector confirma que revision de los ajustes esta usando (``stream=N revision=R``)"""
+        campos = dict(parte.split("=", 1) for parte in texto.split() if "=" in parte)
+        try:
+            stream_id, revision = int(campos["stream"]), int(campos["revision"])
+            escrita = int(self.control_state.get("revision", 0))
+        except (KeyError, TypeError, ValueError):
+            return
+        self.revisiones_aplicadas[stream_id] = revision
+        estado = "al dia" if revision >= escrita else f"falta la {escrita}"
+        self.append_line(f"[INFO] Cam {stream_id} aplica los ajustes de la revision {revision} ({estado})")
 
     def procesar_linea_stdout(self, line: str) -> None:
         """Convierte cada linea JSON en metricas y actualizaciones"""
@@ -492,21 +646,6 @@ class VentanaPrincipal(QWidget):
             return
 
         self.actualizar_metricas(datos)
-        resumen = (
-            f"[METRIC] frame={datos.get('frame')} "
-            f"ear={self.formatear_float(datos.get('ear_smoothed'))} "
-            f"thr={self.formatear_float(datos.get('ear_threshold'))} "
-            f"estado={datos.get('eye_state', '--')}"
-        )
-        frame_actual = datos.get('frame')
-        try:
-            frame_actual = int(frame_actual) if frame_actual is not None else None
-        except (TypeError, ValueError):
-            frame_actual = None
-        if frame_actual is None or frame_actual - self.last_logged_frame >= LOG_INTERVAL_FRAMES:
-            if frame_actual is not None:
-                self.last_logged_frame = frame_actual
-            self.append_line(resumen)
 
     def formatear_float(self, valor, decimales: int = 3) -> str:
         """Normaliza representaciones numericas para las etiquetas"""
@@ -518,12 +657,48 @@ class VentanaPrincipal(QWidget):
             return "--"
 
     def actualizar_metricas(self, datos: dict) -> None:
-        """Actualiza el resumen visible con la informacion mas reciente."""#informacion  de la parte superior de la ventana controles y funcionamiento de la frafica 
+        """Acumula una metrica JSON; el resumen visible se actualiza en el siguiente refresco."""#informacion  de la parte superior de la ventana controles y funcionamiento de la frafica 
+        self._registrar_primera_metrica()
+        stream_id = datos.get("stream_id", 0)
+        self._pendientes[stream_id] = datos
+        self._ultimo_pendiente = datos
+        self._muestras_pendientes += 1
+        if stream_id != self.stream_grafica:
+            return
+        # Igual que con registros binarios: solo el principal, que llega primero en cada frame
+        frame = datos.get("frame")
+        if frame is not None and frame == self._frame_graficado:
+            return
+        self._frame_graficado = frame
+        ear = datos.get("ear_smoothed")
+        ear_thr = datos.get("ear_threshold")
+        self._agregar_series(
+            [float(ear)] if ear is not None else [],
+            [float(ear_thr)] if ear_thr is not None else [],
+        )
+
+    def _registrar_primera_metrica(self) -> None:
+        """Mide el tiempo desde Iniciar hasta la primera metrica de la sesion"""
+        if self._inicio_pedido is None:
+            return
+        self.tiempo_primera_metrica = time.perf_counter() - self._inicio_pedido
+        self._inicio_pedido = None
+        self.append_line(f"[INFO] Primera metrica {self.tiempo_primera_metrica * 1000:.0f} ms despues de Iniciar")
+
+    def _actualizar_resumen(self, datos: dict) -> None:
+        """Reescribe la etiqueta de estado con el ultimo conjunto de metricas."""
+        if len(self.streams) > 1:
+            self._actualizar_resumen_streams()
+            return
         eye_state = datos.get("eye_state")
         pitch = datos.get("pitch")
         closed_frames = datos.get("closed_frames")
         ear_smoothed = datos.get("ear_smoothed")
         ear_threshold = datos.get("ear_threshold")
+        fps = datos.get("fps")
+        inference_ms = datos.get("inference_ms")
+        dropped_frames = datos.get("dropped_frames")
+        inference_fps = datos.get("inference_fps")
 
         resumen: List[str] = []
         if eye_state:
@@ -533,50 +708,120 @@ class VentanaPrincipal(QWidget):
                 resumen.append(f"Cerrados: {int(closed_frames)}")
             except (TypeError, ValueError):
                 resumen.append(f"Cerrados: {closed_frames}")
+        if pitch is not None and pitch == pitch:  # NaN si no se pudo estimar la pose
+            resumen.append(f"Cabeza: {datos.get('head_state') or '--'} ({self.formatear_float(pitch, 1)}°)")
         if ear_smoothed is not None and ear_threshold is not None:
             resumen.append(
                 f"EAR {self.formatear_float(ear_smoothed, 3)}/{self.formatear_float(ear_threshold, 3)}"
             )
+        # Rendimiento del detector: ayuda a notar en campo una unidad sin CPU suficiente
+        if fps:
+            resumen.append(f"FPS {self.formatear_float(fps, 1)}")
+        if inference_ms:
+            resumen.append(f"Inferencia {self.formatear_float(inference_ms, 1)} ms")
+        if inference_fps:
+            # Menor que los FPS cuando el detector salta frames con el conductor tranquilo
+            resumen.append(f"Inferencias/s {self.formatear_float(inference_fps, 1)}")
+        if dropped_frames is not None:
+            resumen.append(f"Descartados: {dropped_frames}")
+        if self.tiempo_primera_metrica is not None:
+            resumen.append(f"Primera metrica: {self.tiempo_primera_metrica * 1000:.0f} ms")
 
         if resumen:
             self.status_label.setText(" | ".join(resumen))
         else:
             self.status_label.setText("Recibiendo datos...")
 
-        ear = datos.get("ear_smoothed")
-        ear_thr = datos.get("ear_threshold")
-        if ear is not None:
-            self.ear_series.append(float(ear))
-            if len(self.ear_series) > 600:
-                del self.ear_series[0]
-        if ear_thr is not None:
-            self.ear_baseline_series.append(float(ear_thr))
-            if len(self.ear_baseline_series) > 600:
-                del self.ear_baseline_series[0]
+    def _actualizar_resumen_streams(self) -> None:
+        """Una linea por fuente con sus FPS y su estado de alerta."""
+        lineas: List[str] = []
+        for stream_id in sorted(self.streams):
+            datos = self.streams[stream_id]
+            partes = [
+                f"Cam {stream_id}",
+                f"FPS {self.formatear_float(datos.get('fps'), 1)}",
+                f"Ojos: {datos.get('eye_state') or '--'}",
+            ]
+            if datos.get("alert"):
+                partes.append("ALERTA")
+            lineas.append(" | ".join(partes))
+        self.status_label.setText("\n".join(lineas))
+
+    def _agregar_series(self, ear_values, ear_thr_values) -> None:
+        """Agrega en bloque a las series circulares; lo mas antiguo se sobrescribe solo."""
+        self.ear_series.extend(ear_values)
+        self.ear_baseline_series.extend(ear_thr_values)
+        self._series_nuevas = True
+
+    def _refrescar_ui(self) -> None:
+        """Pinta el estado acumulado: resumen, log muestreado y grafica si esta visible."""
+        if self._muestras_pendientes:
+            self._mostrar_pendientes()
+        if self.grafica.isVisible():
+            self._refrescar_grafica()
+
+    def _mostrar_pendientes(self) -> None:
+        """Vuelca al resumen la ultima metrica de cada fuente y descarta las intermedias"""
+        for stream_id, datos in self._pendientes.items():
+            self.streams[stream_id] = datos if isinstance(datos, dict) else record_to_dict(datos)
+        ultimo = self._ultimo_pendiente
+        datos = ultimo if isinstance(ultimo, dict) else record_to_dict(ultimo)
+        self.refrescos_ui += 1
+        # Se muestra el ultimo registro de cada fuente; los demas se fusionaron en el refresco
+        self.actualizaciones_fusionadas += self._muestras_pendientes - len(self._pendientes)
+        self._pendientes.clear()
+        self._ultimo_pendiente = None
+        self._muestras_pendientes = 0
+
+        self._actualizar_resumen(datos)
+        frame_actual = datos.get("frame")
+        try:
+            frame_actual = int(frame_actual) if frame_actual is not None else None
+        except (TypeError, ValueError):
+            frame_actual = None
+        if frame_actual is None or frame_actual - self.last_logged_frame >= LOG_INTERVAL_FRAMES:
+            if frame_actual is not None:
+                self.last_logged_frame = frame_actual
+            self.append_line(
+                f"[METRIC] frame={datos.get('frame')} "
+                f"ear={self.formatear_float(datos.get('ear_smoothed'))} "
+                f"thr={self.formatear_float(datos.get('ear_threshold'))} "
+                f"estado={datos.get('eye_state') or '--'}"
+            )
+
+    def _informar_refrescos(self) -> None:
+        if self.refrescos_ui:
+            self.append_line(
+                f"[INFO] Refrescos del panel: {self.refrescos_ui}, "
+                f"actualizaciones fusionadas: {self.actualizaciones_fusionadas}"
+            )
 
     def _refrescar_grafica(self) -> None:
-        """Actualiza la ventana de Matplotlib con las series acumuladas."""
-        if not self.ear_series or not self.ear_baseline_series:
+        """Redibuja las lineas de la grafica embebida si llegaron muestras nuevas."""
+        if not self._series_nuevas or not self.ear_series or not self.ear_baseline_series:
             return
-        grafica(
-            list(self.ear_baseline_series),
-            list(self.ear_series),
-        )
+        self._series_nuevas = False
+        # Vistas ordenadas de los buffers y su rango incremental, sin copiar ni recorrer las series
+        low_ear, high_ear = self.ear_series.minmax()
+        low_thr, high_thr = self.ear_baseline_series.minmax()
+        self.grafica.actualizar(self.ear_baseline_series.view(), self.ear_series.view(),
+                                (min(low_ear, low_thr), max(high_ear, high_thr)))
 
 
 
 
 
     def mostrar_grafica(self) -> None:
-        """Invoca la grafica de EAR si existen datos acumulados."""
-        if not self.ear_series or not self.ear_baseline_series:
-            self.append_line("[WARN] Aun no hay datos suficientes para graficar.")
-            self.status_label.setText("Sin datos para graficar")
+        """Muestra u oculta la grafica embebida; oculta, el refresco no la redibuja."""
+        if self.grafica.isVisible():
+            self.grafica.hide()
+            self.boton_grafica.setText("Mostrar grafica")
             return
 
+        self.grafica.show()
+        self.boton_grafica.setText("Ocultar grafica")
+        self._series_nuevas = True
         self._refrescar_grafica()
-        if not self.timer_grafica.isActive():
-            self.timer_grafica.start()
 #---------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 
 
@@ -617,49 +862,92 @@ class VentanaPrincipal(QWidget):
         super().mouseReleaseEvent(event)
 
     def detener_script(self) -> None:
-        """Termina con cuidado el proceso si sigue en ejecucion"""
-        if self.proceso:
-            if self.proceso.state() != QProcess.NotRunning:
-                self.proceso.terminate()
-                if not self.proceso.waitForFinished(1500):
-                    self.proceso.kill()
-                    self.proceso.waitForFinished(1000)
-            self.append_line("[INFO] angulo.py detenido")
-            self.status_label.setText("angulo.py detenido")
-            self.boton_iniciar.setEnabled(True)
-            self.boton_detener.setEnabled(False)
-            self.timer_grafica.stop()
+        """Pausa el servicio; sin servicio termina con cuidado el proceso"""
+        if not self.detectando:
+            return
+        if self.usa_servicio() and self.proceso is not None:
+            if self._start_pendiente:
+                self._start_pendiente = False  # El start nunca salio: el servicio sigue en pausa
+            else:
+                self.proceso.write(b"pause\n")
+                self._pausas_pedidas += 1
+            self._marcar_detenido("Deteccion en pausa")
+            return
+        self.terminar_proceso()
+        self._marcar_detenido("angulo.py detenido")
+
+    def _marcar_detenido(self, mensaje: str) -> None:
+        if self._muestras_pendientes:
+            self._mostrar_pendientes()  # Lo ultimo que llego, antes de que el mensaje lo tape
+        self._informar_refrescos()
+        self.detectando = False
+        self._inicio_pedido = None
+        self.append_line(f"[INFO] {mensaje}")
+        self.status_label.setText(mensaje)
+        self.boton_iniciar.setEnabled(True)
+        self.boton_detener.setEnabled(False)
+
+    def terminar_proceso(self) -> None:
+        """Cierra el proceso del detector: quit por stdin, luego terminate/kill"""
+        if not self.proceso or self.proceso.state() == QProcess.NotRunning:
+            return
+        # angulo.py y supervisor.py corren con --service; en Windows terminate() no llega a un proceso de consola
+        self.proceso.write(b"quit\n")
+        # supervisor.py tambien espera a que cada fuente suelte su camara
+        if self.proceso.waitForFinished(1500 if self.usa_servicio() else SUPERVISOR_QUIT_TIMEOUT_MS):
+            return
+        self.proceso.terminate()
+        if not self.proceso.waitForFinished(1500):
+            self.proceso.kill()
+            self.proceso.waitForFinished(1000)
 
     def proceso_termino(self, exitCode: int, exitStatus: QProcess.ExitStatus) -> None:
         """Gestiona el cierre natural del proceso e informa en UI"""
+        if self._muestras_pendientes:
+            self._mostrar_pendientes()
+        if self.detectando:
+            self._informar_refrescos()  # Si ya se detuvo, _marcar_detenido lo informo
         self.append_line(f"[INFO] angulo.py termino (code={exitCode})")
         self.status_label.setText("Proceso finalizado")
+        self.detectando = False
+        self._inicio_pedido = None
+        self._pausas_pedidas = 0
+        self._start_pendiente = False
         self.boton_iniciar.setEnabled(True)
         self.boton_detener.setEnabled(False)
-        self.proceso = None  
-
-        
+        self.proceso = None
 
     def reset_metrics(self) -> None:
         """Resetea buffers para una nueva sesion."""
-        self.stdout_buffer = ""
+        self.metrics_decoder.reset()
         self.last_logged_frame = -LOG_INTERVAL_FRAMES
         self.status_label.setText("Esperando datos del detector...")
-        self.timer_grafica.stop()
+        self.streams.clear()
+        self._frame_graficado = None
+        self._pendientes.clear()
+        self._ultimo_pendiente = None
+        self._muestras_pendientes = 0
+        self.refrescos_ui = 0
+        self.actualizaciones_fusionadas = 0
         self.ear_series.clear()
         self.ear_baseline_series.clear()
+        self._series_nuevas = False
+        self.grafica.limpiar()
 
     def closeEvent(self, event) -> None:  # type: ignore[override]
         """Detiene el proceso al cerrar la ventana para evitar zombies"""
-        self.timer_grafica.stop()
+        self.timer_ui.stop()
+        if self.timer_guardado.isActive():
+            self.flush_control_state()
         try:
-            self.detener_script()
+            self.terminar_proceso()
         finally:
 
             event.accept()
 
 if __name__ == "__main__":
+    # Fuentes opcionales: python interfaz_ventana.py 0 1 pasillo.mp4
     app = QApplication(sys.argv)
-    ventana = VentanaPrincipal()
+    ventana = VentanaPrincipal(sources=sys.argv[1:])
     ventana.show()
     sys.exit(app.exec_())
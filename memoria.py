@@ -0,0 +1,48 @@
+"""Buffers preasignados que se reutilizan frame a frame.
+
+A 1040x1040x3 cada ``cap.read()``, ``cv2.flip`` o ``cv2.cvtColor`` sin
+destino reserva unos 3 MB nuevos. Con ``BufferPool`` cada etapa pide su
+buffer por nombre y se lo pasa a OpenCV como ``dst``; en regimen estable
+``allocations`` deja de crecer.
+"""
+from typing import Dict
+
+import numpy as np
+
+
+class BufferPool:
+    """Arreglos con nombre que solo se reservan la primera vez o si hace falta uno mas grande.
+
+    ``take()`` devuelve una vista C-contigua del tamaño pedido sobre un arreglo
+    plano, asi un recorte que cambia de tamaño entre frames reutiliza la misma
+    memoria. No es seguro entre hilos: cada hilo usa su propio pool.
+    """
+
+    def __init__(self) -> None:
+        self._backing: Dict[str, np.ndarray] = {}
+        self.allocations = 0  # Reservas nuevas desde que se creo el pool
+        self.requests = 0
+
+    def take(self, name: str, shape, dtype=np.uint8) -> np.ndarray:
+        dtype = np.dtype(dtype)
+        size = int(np.prod(shape))
+        backing = self._backing.get(name)
+        if backing is None or backing.dtype != dtype or backing.size < size:
+            backing = self._backing[name] = np.empty(size, dtype=dtype)
+            self.allocations += 1
+        self.requests += 1
+        return backing[:size].reshape(shape)
+
+    def confirm(self, name: str, dst: np.ndarray, result: np.ndarray) -> np.ndarray:
+        """Verifica que OpenCV escribio en ``dst``; si reservo otro arreglo, se adopta y se cuenta."""
+        if result is not None and result.ctypes.data != dst.ctypes.data:
+            self.allocations += 1
+            if result.flags.c_contiguous:
+                self._backing[name] = result.reshape(-1)
+        return result
+
+    def adopt(self, name: str, array: np.ndarray) -> np.ndarray:
+        """Registra como buffer un arreglo que ya se reservo afuera (por ejemplo el primer frame)."""
+        self.allocations += 1
+        self._backing[name] = np.ascontiguousarray(array).reshape(-1)
+        return array
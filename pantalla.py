@@ -0,0 +1,88 @@
+"""Etapa de visualizacion: espejo, overlay y ventana, solo sobre el frame mostrado.
+
+La inferencia trabaja sobre el frame de la camara sin voltear (el detector
+refleja los landmarks); voltear, dibujar y ``imshow`` quedan como ultima etapa
+opcional del bucle y no corren en modo headless.
+"""
+from typing import Optional
+
+import cv2
+import numpy as np
+
+from geometria_ojos import EYE_INDEX
+from instrumentacion import NULL_TIMER, now
+from memoria import BufferPool
+
+TEXT_COLOR = (0, 255, 255)
+ALERT_COLOR = (0, 0, 255)
+LANDMARK_COLOR = (0, 255, 0)
+
+
+def draw_overlays(frame, analysis, control) -> None:
+    """Dibuja landmarks, textos y la alerta visual sobre el frame mostrado."""
+    height = frame.shape[0]
+    if control.show_landmarks:
+        for points in analysis.faces:
+            for x, y in points[EYE_INDEX.ravel(), :2].astype(int).tolist():
+                cv2.circle(frame, (x, y), 2, LANDMARK_COLOR, -1)
+
+    if not analysis.face_found or not control.show_text:
+        return
+    if len(analysis.occupants) > 1:
+        # Etiqueta de cada ocupante sobre su ojo izquierdo, en rojo si esta en alerta
+        for face in analysis.occupants:
+            x, y = face.points[EYE_INDEX[0, 0], :2].astype(int).tolist()
+            color = ALERT_COLOR if face.alert else TEXT_COLOR
+            cv2.putText(frame, f"#{face.face_id} {face.ear_smoothed:.2f}", (x, y - 30), 1, 1.2, color, 2)
+    cv2.putText(frame, f"EAR: {analysis.ear_smoothed:.3f}", (20, height - 140), 1, 1.5, TEXT_COLOR, 2)
+    cv2.putText(frame, f"Umbral: {analysis.ear_threshold:.3f}", (20, height - 110), 1, 1.5, TEXT_COLOR, 2)
+    cv2.putText(frame, f"Pitch: {analysis.pitch:.1f} ({analysis.head_state})", (20, height - 80), 1, 1.5,
+                TEXT_COLOR, 2)
+    if analysis.eye_state == "calibrando":
+        cv2.putText(frame, "Calibrando ojos... mantelos abiertos", (20, height - 170), 0, 0.7, TEXT_COLOR, 2)
+    if analysis.alert and control.visual_alert:
+        cv2.putText(frame, "ALERTA", (75, 75), cv2.FONT_HERSHEY_SIMPLEX, 1, ALERT_COLOR, 2)
+
+
+class DisplayStage:
+    """Muestra el ultimo analisis en una ventana; voltea solo la copia que se muestra.
+
+    El frame de la camara no se modifica: el espejo (o la copia, sin espejo)
+    se escribe en un buffer propio y sobre ese se dibuja el overlay.
+    """
+
+    def __init__(self, window: str = "Video.Capture", mirror: bool = True, timer=NULL_TIMER,
+                 buffers: Optional[BufferPool] = None) -> None:
+        self.window = window
+        self.mirror = mirror
+        self.timer = timer
+        self.buffers = buffers if buffers is not None else BufferPool()
+        self._window_open = False
+
+    def render(self, frame: np.ndarray, analysis, control) -> np.ndarray:
+        """Espejo y overlay en el buffer de la etapa; devuelve el frame listo para mostrar."""
+        started = now()
+        shown = self.buffers.take("display", frame.shape, frame.dtype)
+        if self.mirror:
+            shown = self.buffers.confirm("display", shown, cv2.flip(frame, 1, dst=shown))
+        else:
+            np.copyto(shown, frame)
+        self.timer.record("flip", now() - started)
+
+        started = now()
+        draw_overlays(shown, analysis, control)
+        self.timer.record("overlay", now() - started)
+        return shown
+
+    def show(self, frame: np.ndarray, analysis, control) -> None:
+        shown = self.render(frame, analysis, control)
+        started = now()
+        cv2.imshow(self.window, shown)
+        self._window_open = True
+        self.timer.record("display", now() - started)
+
+    def close(self) -> None:
+        """Cierra la ventana; la proxima llamada a ``show()`` la vuelve a abrir."""
+        if self._window_open:
+            cv2.destroyWindow(self.window)
+            self._window_open = False
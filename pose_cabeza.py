@@ -0,0 +1,105 @@
+"""Inclinacion de la cabeza (pitch) a partir de seis landmarks de FaceMesh.
+
+``solvePnP`` ajusta un modelo 3D generico del rostro a la nariz, el menton y
+las esquinas de ojos y boca. La matriz de la camara se construye una vez por
+resolucion y cada ocupante arranca el ajuste desde la pose del frame anterior
+(``useExtrinsicGuess``), asi el metodo iterativo converge en pocas vueltas.
+"""
+import math
+from typing import Dict, Tuple
+
+import cv2
+import numpy as np
+
+# Nariz, menton, esquina externa de cada ojo y comisuras de la boca
+POSE_LANDMARKS = [1, 152, 33, 263, 61, 291]
+
+# Modelo generico en mm con la convencion de la camara: x a la derecha de la
+# imagen, y hacia abajo, z alejandose de la camara; origen en la punta de la nariz
+MODEL_POINTS = np.array([
+    (0.0, 0.0, 0.0),
+    (0.0, 330.0, 65.0),
+    (-225.0, -170.0, 135.0),
+    (225.0, -170.0, 135.0),
+    (-150.0, 150.0, 125.0),
+    (150.0, 150.0, 125.0),
+], dtype=np.float64)
+# Con la vista espejo los ojos y las comisuras quedan del lado contrario
+MIRRORED_MODEL_POINTS = MODEL_POINTS * (-1.0, 1.0, 1.0)
+
+HEAD_STATES = ("centro", "adelante", "atras")
+HEAD_STATE_CODES = {name: code for code, name in enumerate(HEAD_STATES)}
+
+
+def camera_matrix(width: int, height: int) -> np.ndarray:
+    """Intrinsecos aproximados: foco igual al ancho y centro optico al centro de la imagen."""
+    return np.array([
+        [width, 0.0, width / 2.0],
+        [0.0, width, height / 2.0],
+        [0.0, 0.0, 1.0],
+    ], dtype=np.float64)
+
+
+def rotation_pitch(rvec: np.ndarray) -> float:
+    """Angulo alrededor del eje x en grados; positivo cuando la cabeza cae hacia adelante."""
+    rotation, _ = cv2.Rodrigues(rvec)
+    return math.degrees(math.atan2(rotation[2, 1], rotation[2, 2]))
+
+
+class HeadPoseEstimator:
+    """Pitch por ocupante con arranque en caliente del ajuste de pose.
+
+    Guarda ``rvec``/``tvec`` por slot del ``FaceTracker`` en arreglos
+    (max_faces, 3, 1); ``reset()`` descarta la pose de un slot cuando entra un
+    ocupante nuevo.
+    """
+
+    def __init__(self, max_faces: int = 1) -> None:
+        self.max_faces = max(1, int(max_faces))
+        self._rvecs = np.zeros((self.max_faces, 3, 1), dtype=np.float64)
+        self._tvecs = np.zeros((self.max_faces, 3, 1), dtype=np.float64)
+        self._warm = np.zeros(self.max_faces, dtype=bool)
+        self._mirrored = np.zeros(self.max_faces, dtype=bool)
+        self._intrinsics: Dict[Tuple[int, int], np.ndarray] = {}
+        self._distortion = np.zeros((4, 1), dtype=np.float64)
+
+    def intrinsics(self, width: int, height: int) -> np.ndarray:
+        key = (width, height)
+        matrix = self._intrinsics.get(key)
+        if matrix is None:
+            matrix = self._intrinsics[key] = camera_matrix(width, height)
+        return matrix
+
+    def reset(self, slots=None) -> None:
+        if slots is None:
+            self._warm[:] = False
+        else:
+            self._warm[slots] = False
+
+    def estimate(self, points: np.ndarray, slot: int, width: int, height: int) -> float:
+        """Pitch en grados del rostro ``points`` (N, 3) en pixeles; NaN si el ajuste falla."""
+        image_points = points[POSE_LANDMARKS, :2].astype(np.float64)
+        # En un frame espejo el ojo 33 queda a la derecha del 263
+        mirrored = bool(image_points[2, 0] > image_points[3, 0])
+        model = MIRRORED_MODEL_POINTS if mirrored else MODEL_POINTS
+        warm = bool(self._warm[slot]) and mirrored == self._mirrored[slot]
+        rvec = self._rvecs[slot]
+        tvec = self._tvecs[slot]
+        ok, rvec, tvec = cv2.solvePnP(
+            model,
+            image_points,
+            self.intrinsics(width, height),
+            self._distortion,
+            rvec=rvec if warm else None,
+            tvec=tvec if warm else None,
+            useExtrinsicGuess=warm,
+            flags=cv2.SOLVEPNP_ITERATIVE,
+        )
+        if not ok:
+            self._warm[slot] = False
+            return float("nan")
+        self._rvecs[slot] = rvec
+        self._tvecs[slot] = tvec
+        self._warm[slot] = True
+        self._mirrored[slot] = mirrored
+        return rotation_pitch(rvec)
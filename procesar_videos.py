@@ -0,0 +1,148 @@
+"""Procesa videos grabados de cabina sin ventana y guarda las metricas por frame.
+
+Ejemplo:
+    python procesar_videos.py grabaciones/ --output resultados/ --frame-threshold 40
+
+Cada video produce un ``.npz`` con una columna por metrica (las mismas que
+emite angulo.py, mas ``timestamp_ms``, ``face_found`` y ``alert``). Los
+archivos se reparten entre procesos, uno por nucleo por defecto.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import List, Tuple
+
+import cv2
+import numpy as np
+
+from control_estado import ControlSettings, build_settings
+from detector import DrowsinessDetector
+from inferencia import INFERENCE_SIZE
+from pose_cabeza import HEAD_STATE_CODES
+from telemetria import EYE_STATE_CODES
+
+VIDEO_EXTENSIONS = {".mp4", ".avi", ".mkv", ".mov", ".m4v", ".webm"}
+
+# Columnas del archivo de salida
+COLUMNS = [
+    ("frame", np.uint32),
+    ("timestamp_ms", np.float64),
+    ("face_found", np.bool_),
+    ("ear_raw", np.float32),
+    ("ear_metric", np.float32),
+    ("ear_smoothed", np.float32),
+    ("ear_threshold", np.float32),
+    ("eye_state", np.uint8),
+    ("closed_frames", np.uint32),
+    ("alert", np.bool_),
+    ("pitch", np.float32),
+    ("head_state", np.uint8),
+]
+
+
+def collect_videos(inputs: List[Path], output_dir: Path) -> List[Tuple[Path, Path]]:
+    """Expande archivos y carpetas en pares (video, archivo de salida)."""
+    jobs = []
+    for source in inputs:
+        if source.is_dir():
+            for path in sorted(source.rglob("*")):
+                if path.suffix.lower() in VIDEO_EXTENSIONS:
+                    # Se replica la estructura de carpetas para evitar choques de nombres
+                    jobs.append((path, output_dir / path.relative_to(source).with_suffix(".npz")))
+        elif source.is_file():
+            jobs.append((source, output_dir / source.with_suffix(".npz").name))
+        else:
+            print(f"[WARN] No existe {source}", file=sys.stderr)
+    return jobs
+
+
+def _init_worker() -> None:
+    # Un hilo de OpenCV por proceso: el paralelismo lo da el pool
+    cv2.setNumThreads(1)
+
+
+def process_video(video: Path, output: Path, settings: ControlSettings, flip: bool,
+                  inference_size: int) -> Tuple[str, int, float]:
+    """Corre el detector sobre todo el video y escribe el archivo columnar."""
+    cap = cv2.VideoCapture(str(video))
+    if not cap.isOpened():
+        raise RuntimeError(f"No se pudo abrir {video}")
+
+    columns = {name: [] for name, _ in COLUMNS}
+    started = time.perf_counter()
+    with DrowsinessDetector(inference_size=inference_size, mirror=flip) as detector:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            timestamp_ms = cap.get(cv2.CAP_PROP_POS_MSEC)
+            analysis = detector.process(frame, settings)
+            columns["frame"].append(analysis.frame)
+            columns["timestamp_ms"].append(timestamp_ms)
+            columns["face_found"].append(analysis.face_found)
+            columns["ear_raw"].append(analysis.ear_raw)
+            columns["ear_metric"].append(analysis.ear_metric)
+            columns["ear_smoothed"].append(analysis.ear_smoothed)
+            columns["ear_threshold"].append(analysis.ear_threshold)
+            columns["eye_state"].append(EYE_STATE_CODES[analysis.eye_state])
+            columns["closed_frames"].append(analysis.closed_frames)
+            columns["alert"].append(analysis.alert)
+            columns["pitch"].append(analysis.pitch)
+            columns["head_state"].append(HEAD_STATE_CODES[analysis.head_state])
+    cap.release()
+    elapsed = time.perf_counter() - started
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    np.savez_compressed(
+        output,
+        **{name: np.asarray(columns[name], dtype=dtype) for name, dtype in COLUMNS},
+    )
+    return str(video), len(columns["frame"]), elapsed
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Procesa videos grabados sin ventana y guarda metricas por frame.")
+    parser.add_argument("inputs", nargs="+", type=Path, help="Videos o carpetas con videos")
+    parser.add_argument("--output", "-o", type=Path, required=True, help="Carpeta para los archivos .npz")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Procesos en paralelo")
+    parser.add_argument("--flip", action="store_true", help="Landmarks en coordenadas de la vista espejo, como en vivo")
+    parser.add_argument("--control", type=Path, default=None, help="Archivo de control con los ajustes a usar")
+    parser.add_argument("--ear-ratio", type=float, default=None, help="Sobrescribe ear_dynamic_ratio")
+    parser.add_argument("--frame-threshold", type=int, default=None, help="Sobrescribe frame_threshold")
+    parser.add_argument("--inference-size", type=int, default=INFERENCE_SIZE,
+                        help="Lado mayor del recorte del rostro que recibe FaceMesh")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    settings = build_settings(args.control, args.ear_ratio, args.frame_threshold)
+    jobs = collect_videos(args.inputs, args.output)
+    if not jobs:
+        print("[WARN] No se encontraron videos para procesar", file=sys.stderr)
+        return 1
+
+    workers = max(1, min(args.workers, len(jobs)))
+    failures = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = {
+            pool.submit(process_video, video, output, settings, args.flip, args.inference_size): video
+            for video, output in jobs
+        }
+        for future in as_completed(futures):
+            try:
+                video, frames, elapsed = future.result()
+            except Exception as exc:
+                failures += 1
+                print(f"[ERROR] {futures[future]}: {exc}", file=sys.stderr)
+                continue
+            fps = frames / elapsed if elapsed > 0 else 0.0
+            print(f"[INFO] {video}: {frames} frames en {elapsed:.1f}s ({fps:.1f} fps)")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
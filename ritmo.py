@@ -0,0 +1,131 @@
+import time
+from typing import Optional
+
+import cv2
+import numpy as np
+
+from instrumentacion import now
+from seguimiento import face_centroids
+
+GUI_MIN_WAIT_MS = 1  # Espera minima para que HighGUI procese eventos de la ventana
+MIN_INFERENCE_FPS = 10.0  # Inferencias por segundo con el conductor tranquilo (0 = siempre a ritmo activo)
+MAX_INFERENCE_FPS = 0.0  # Tope de inferencias por segundo cerca del umbral (0 = todos los frames)
+RELAXED_EAR_MARGIN = 0.02  # EAR suavizado minimo por encima del umbral para considerar los ojos claramente abiertos
+STILL_MOTION = 0.05  # Desplazamiento maximo de los ojos entre inferencias, en anchos de rostro
+RELAX_AFTER = 5  # Inferencias tranquilas seguidas antes de bajar el ritmo
+
+
+class FramePacer:
+    """Ritmo del bucle de frames en lugar del cv2.waitKey(20) fijo.
+
+    Con ``target_fps`` (> 0) cada frame tiene un plazo; si sobra tiempo se
+    espera solo lo que falta, y si el frame llega tarde se cuenta en
+    ``missed_deadlines`` y el plazo se reinicia desde ahora. Sin objetivo el
+    bucle corre tan rapido como pueda. Con ventana abierta la espera se hace
+    dentro de ``cv2.waitKey`` para atender eventos; sin ventana no se toca
+    HighGUI.
+    """
+
+    def __init__(self, target_fps: Optional[float] = None, display: bool = True) -> None:
+        self.period = 1.0 / target_fps if target_fps else 0.0
+        self.display = display
+        self.missed_deadlines = 0
+        self.frames = 0
+        self._deadline: Optional[float] = None
+
+    def reset(self) -> None:
+        """Olvida el plazo pendiente, por ejemplo al reanudar despues de una pausa."""
+        self._deadline = None
+
+    def wait(self) -> int:
+        """Espera hasta el plazo del frame; devuelve la tecla pulsada o -1."""
+        current = now()
+        remaining = 0.0
+        if self.period:
+            if self._deadline is None:
+                self._deadline = current + self.period
+            remaining = self._deadline - current
+            if remaining < 0:
+                self.missed_deadlines += 1
+                self._deadline = current + self.period
+                remaining = 0.0
+            else:
+                self._deadline += self.period
+        self.frames += 1
+
+        if self.display:
+            return cv2.waitKey(max(GUI_MIN_WAIT_MS, int(remaining * 1000))) & 0xFF
+        if remaining > 0:
+            time.sleep(remaining)
+        return -1
+
+
+class InferenceRateScheduler:
+    """Baja la frecuencia de inferencia mientras el conductor esta tranquilo.
+
+    Con los ojos claramente abiertos (EAR suavizado al menos ``ear_margin`` por
+    encima del umbral, sin frames cerrados) y la cabeza quieta durante
+    ``relax_after`` inferencias seguidas, el detector corre a ``min_fps``; en
+    los frames intermedios se reutiliza el ultimo analisis. En cuanto el EAR
+    se acerca al umbral, hay frames cerrados, se calibra o la cabeza se mueve,
+    vuelve a ``max_fps`` (0 = todos los frames). Asi el retraso extra para
+    detectar un cierre de ojos esta acotado por ``1 / min_fps``.
+    """
+
+    def __init__(self, min_fps: float = MIN_INFERENCE_FPS, max_fps: float = MAX_INFERENCE_FPS,
+                 ear_margin: float = RELAXED_EAR_MARGIN, still_motion: float = STILL_MOTION,
+                 relax_after: int = RELAX_AFTER) -> None:
+        self.active_interval = 1.0 / max_fps if max_fps else 0.0
+        # min_fps = 0 desactiva el modo relajado: siempre se infiere al ritmo activo
+        self.relaxed_interval = 1.0 / min_fps if min_fps else self.active_interval
+        self.ear_margin = float(ear_margin)
+        self.still_motion = float(still_motion)
+        self.relax_after = max(1, int(relax_after))
+        self.stable = 0  # Inferencias seguidas con ojos abiertos y cabeza quieta
+        self.runs = 0
+        self.skips = 0
+        self._last_run = float("-inf")
+        self._centroids: Optional[np.ndarray] = None
+
+    def reset(self) -> None:
+        """Vuelve al ritmo activo e infiere en el siguiente frame (p. ej. al reanudar tras una pausa)."""
+        self.stable = 0
+        self._last_run = float("-inf")
+        self._centroids = None
+
+    @property
+    def relaxed(self) -> bool:
+        return self.stable >= self.relax_after
+
+    def should_infer(self, timestamp: float) -> bool:
+        """True si este frame debe pasar por el detector."""
+        interval = self.relaxed_interval if self.relaxed else self.active_interval
+        # Tolerancia del 10% para que el jitter de la camara no salte un frame extra
+        if timestamp - self._last_run >= interval * 0.9:
+            self._last_run = timestamp
+            self.runs += 1
+            return True
+        self.skips += 1
+        return False
+
+    def update(self, analysis) -> None:
+        """Revisa el analisis recien calculado para decidir el ritmo de los siguientes frames."""
+        if not analysis.face_found:
+            self.stable = 0
+            self._centroids = None
+            return
+        calm = all(
+            face.eye_state == "abiertos"
+            and face.closed_frames == 0
+            and face.ear_smoothed >= face.ear_threshold + self.ear_margin
+            for face in analysis.occupants
+        )
+        centroids, widths = face_centroids(np.asarray(analysis.faces))
+        previous = self._centroids
+        still = (
+            previous is not None
+            and previous.shape == centroids.shape
+            and float((np.linalg.norm(centroids - previous, axis=1) / widths).max()) <= self.still_motion
+        )
+        self._centroids = centroids
+        self.stable = self.stable + 1 if calm and still else 0
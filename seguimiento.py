@@ -0,0 +1,89 @@
+"""Identidad estable de los rostros entre frames.
+
+FaceMesh no garantiza el orden de ``multi_face_landmarks``; si hay conductor y
+copiloto, el rostro 0 de un frame puede ser el 1 del siguiente. ``FaceTracker``
+asocia cada rostro con el slot cuyo centroide estaba mas cerca en el frame
+anterior, asi el estado de somnolencia de cada ocupante no se mezcla.
+"""
+from typing import List, Tuple
+
+import numpy as np
+
+from geometria_ojos import EYE_LANDMARKS
+
+TRACK_MAX_DISTANCE = 1.0  # Desplazamiento maximo del centroide, en anchos de rostro, para conservar el ID
+
+
+def face_centroids(faces: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Centroide (x, y) y ancho aproximado de cada rostro (F, N, 3) a partir de los ojos."""
+    eyes = faces[:, EYE_LANDMARKS, :2]
+    centroids = eyes.mean(axis=1)
+    widths = np.maximum(eyes[:, :, 0].max(axis=1) - eyes[:, :, 0].min(axis=1), 1.0)
+    return centroids, widths
+
+
+class FaceTracker:
+    """Asigna a cada rostro un slot fijo (0..max_faces-1) y un ID que no se repite.
+
+    Un slot conserva su ID mientras su rostro aparezca cerca de donde estaba.
+    Un rostro sin pareja toma un slot libre o, si no hay, el que lleva mas
+    tiempo sin verse; en ese caso recibe un ID nuevo y el detector reinicia el
+    estado de ese slot.
+    """
+
+    def __init__(self, max_faces: int, max_distance: float = TRACK_MAX_DISTANCE) -> None:
+        self.max_faces = max(1, int(max_faces))
+        # Con un solo rostro no hay nada que confundir: siempre es el mismo ocupante
+        self.max_distance = max_distance if self.max_faces > 1 else np.inf
+        self.ids = np.full(self.max_faces, -1, dtype=np.int64)  # -1 = slot libre
+        self.centroids = np.zeros((self.max_faces, 2), dtype=np.float64)
+        self.last_seen = np.full(self.max_faces, -1, dtype=np.int64)
+        self.next_id = 0
+        self._frame = 0
+
+    def assign(self, faces: np.ndarray) -> Tuple[np.ndarray, List[int]]:
+        """Devuelve el slot de cada rostro y la lista de slots que recibieron un ID nuevo."""
+        self._frame += 1
+        count = len(faces)
+        slots = np.full(count, -1, dtype=np.intp)
+        if count == 0:
+            return slots, []
+        centroids, widths = face_centroids(faces)
+
+        in_use = self.ids >= 0
+        if in_use.any():
+            distances = np.linalg.norm(centroids[:, None, :] - self.centroids[None, :, :], axis=2) / widths[:, None]
+            distances[:, ~in_use] = np.inf
+            # Emparejamiento voraz de la distancia mas corta a la mas larga
+            taken = np.zeros(self.max_faces, dtype=bool)
+            for flat in np.argsort(distances, axis=None):
+                face, slot = divmod(int(flat), self.max_faces)
+                if distances[face, slot] > self.max_distance:
+                    break
+                if slots[face] < 0 and not taken[slot]:
+                    slots[face] = slot
+                    taken[slot] = True
+
+        new_slots = []
+        for face in np.flatnonzero(slots < 0).tolist():
+            free = np.flatnonzero((self.ids < 0) & ~np.isin(np.arange(self.max_faces), slots))
+            if len(free):
+                slot = int(free[0])
+            else:
+                candidates = np.setdiff1d(np.arange(self.max_faces), slots)
+                if not len(candidates):
+                    continue
+                slot = int(candidates[np.argmin(self.last_seen[candidates])])
+            slots[face] = slot
+            self.ids[slot] = self.next_id
+            self.next_id += 1
+            new_slots.append(slot)
+
+        matched = slots >= 0
+        self.centroids[slots[matched]] = centroids[matched]
+        self.last_seen[slots[matched]] = self._frame
+        return slots, new_slots
+
+    def reset(self) -> None:
+        self.ids[:] = -1
+        self.last_seen[:] = -1
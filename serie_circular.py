@@ -0,0 +1,92 @@
+"""Series de capacidad fija para las graficas del panel."""
+from typing import Tuple
+
+import numpy as np
+
+RANGE_BLOCK = 64  # Muestras por bloque del minimo/maximo incremental
+
+
+class SerieCircular:
+    """Buffer circular de floats con vista ordenada sin copias.
+
+    Cada muestra se escribe dos veces, en ``i`` y en ``i + capacity``, dentro
+    de un arreglo preasignado de ``2 * capacity``. Asi las ultimas ``len(self)``
+    muestras siempre forman un tramo contiguo y ``view()`` devuelve una rebanada
+    de NumPy en orden cronologico sin reordenar ni copiar. Agregar cuesta lo
+    mismo sin importar la capacidad.
+
+    ``minmax()`` no recorre la serie: se guarda el minimo y el maximo de cada
+    bloque de ``RANGE_BLOCK`` posiciones y solo se recalculan los bloques que
+    toco la ultima escritura. Cuando lo viejo se sobrescribe el rango se achica.
+    """
+
+    def __init__(self, capacity: int, dtype=np.float64) -> None:
+        if capacity < 1:
+            raise ValueError("capacity debe ser al menos 1")
+        self.capacity = int(capacity)
+        self._data = np.zeros(2 * self.capacity, dtype=dtype)
+        self._head = 0  # Posicion (modulo capacity) de la proxima escritura
+        self._size = 0
+        blocks = -(-self.capacity // RANGE_BLOCK)
+        self._block_min = np.full(blocks, np.inf)
+        self._block_max = np.full(blocks, -np.inf)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, value: float) -> None:
+        cap = self.capacity
+        head = self._head
+        self._data[head] = value
+        self._data[head + cap] = value
+        self._head = (head + 1) % cap
+        self._size = min(self._size + 1, cap)
+        self._refresh_blocks(head, head + 1)
+
+    def extend(self, values) -> None:
+        """Agrega un bloque de muestras; si excede la capacidad solo quedan las ultimas."""
+        values = np.asarray(values, dtype=self._data.dtype).ravel()
+        cap = self.capacity
+        if len(values) > cap:
+            values = values[-cap:]
+        count = len(values)
+        if count == 0:
+            return
+        head = self._head
+        first = min(count, cap - head)
+        self._data[head:head + first] = values[:first]
+        self._data[head + cap:head + cap + first] = values[:first]
+        rest = count - first
+        if rest:
+            self._data[:rest] = values[first:]
+            self._data[cap:cap + rest] = values[first:]
+        self._head = (head + count) % cap
+        self._size = min(self._size + count, cap)
+        self._refresh_blocks(head, head + first)
+        if rest:
+            self._refresh_blocks(0, rest)
+
+    def _refresh_blocks(self, start: int, stop: int) -> None:
+        """Recalcula el minimo y maximo de los bloques que cubren las posiciones [start, stop)."""
+        # Mientras la serie no se llena, las posiciones validas son [0, size); lo demas es de antes de clear()
+        valid = self.capacity if self._size == self.capacity else self._size
+        for block in range(start // RANGE_BLOCK, (stop - 1) // RANGE_BLOCK + 1):
+            values = self._data[block * RANGE_BLOCK:min((block + 1) * RANGE_BLOCK, valid)]
+            self._block_min[block] = values.min()
+            self._block_max[block] = values.max()
+
+    def minmax(self) -> Tuple[float, float]:
+        """(minimo, maximo) de las muestras actuales; (inf, -inf) si la serie esta vacia."""
+        blocks = -(-self._size // RANGE_BLOCK)
+        if blocks == 0:
+            return float("inf"), float("-inf")
+        return float(self._block_min[:blocks].min()), float(self._block_max[:blocks].max())
+
+    def view(self) -> np.ndarray:
+        """Muestras en orden cronologico; es una vista que cambia con la serie."""
+        end = self._head + self.capacity
+        return self._data[end - self._size:end]
+
+    def clear(self) -> None:
+        self._head = 0
+        self._size = 0
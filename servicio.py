@@ -0,0 +1,66 @@
+"""Modo servicio de angulo.py: el proceso sigue vivo y el panel solo lo pausa o reanuda.
+
+Asi Iniciar/Detener no vuelve a importar MediaPipe, construir FaceMesh y
+FaceDetection ni abrir la camara. Protocolo por lineas:
+
+* stdin (panel -> detector): ``start``, ``pause`` o ``quit``. Si stdin se
+  cierra (el panel termino) equivale a ``quit``.
+* stderr (detector -> panel): ``[SERVICE] ready`` cuando los modelos y la
+  camara estan listos, y ``[SERVICE] running`` / ``[SERVICE] paused`` en cada
+  cambio de estado.
+
+Las metricas siguen saliendo por stdout igual que sin servicio.
+"""
+import queue
+import sys
+import threading
+from typing import Optional
+
+SERVICE_PREFIX = "[SERVICE] "
+COMMANDS = ("start", "pause", "quit")
+
+
+class CommandReader:
+    """Lee comandos de stdin en un hilo; el bucle de frames los consulta sin bloquearse."""
+
+    def __init__(self, stream=None) -> None:
+        self.stream = stream if stream is not None else sys.stdin
+        self._queue: "queue.Queue[str]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "CommandReader":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="CommandReader", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        for line in self.stream:
+            command = line.strip().lower()
+            if command in COMMANDS:
+                self._queue.put(command)
+            elif command:
+                print(f"[WARN] Comando desconocido: {command}", file=sys.stderr, flush=True)
+        self._queue.put("quit")
+
+    def push(self, command: str) -> None:
+        """Encola un comando generado por el propio detector (p. ej. 'Esc' en la ventana)."""
+        self._queue.put(command)
+
+    def poll(self) -> Optional[str]:
+        """Siguiente comando pendiente, o None sin esperar."""
+        try:
+            return self._queue.get_nowait()
+        except queue.Empty:
+            return None
+
+    def wait(self, timeout: Optional[float] = None) -> Optional[str]:
+        """Bloquea hasta el siguiente comando (mientras el detector esta en pausa)."""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+def announce(state: str) -> None:
+    print(f"{SERVICE_PREFIX}{state}", file=sys.stderr, flush=True)
@@ -0,0 +1,282 @@
+"""Corre varios detectores en paralelo, uno por camara o video, en el mismo equipo.
+
+Ejemplo:
+    python supervisor.py --source 0 --source 1 --source pasillo.mp4
+    python supervisor.py --source 0 --control cabina.json --source 1 --control puerta.json
+
+Cada fuente tiene su propio proceso con su detector, su archivo de control y su
+anillo de estadisticas. Los procesos se fijan a nucleos distintos cuando el
+sistema lo permite (``os.sched_setaffinity``). Sus metricas llegan por una cola
+al proceso principal, que las reenvia por stdout con el mismo formato que
+angulo.py; el campo ``stream_id`` de cada registro indica de que fuente vino.
+
+Con ``--service`` (lo usa el panel) un ``quit`` por stdin, o stdin cerrado,
+detiene todas las fuentes. En Windows ``QProcess.terminate()`` no llega a un
+proceso de consola; por eso ademas cada proceso de fuente termina solo si el
+supervisor muere sin avisar, y asi no queda una camara abierta.
+"""
+import argparse
+import multiprocessing as mp
+import os
+import queue
+import signal
+import sys
+import threading
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Union
+
+import cv2
+
+from alertas import ALERT_MIN_INTERVAL, BACKENDS, AlertEngine, create_backend
+from angulo import open_camera
+from bucle import DetectionLoop
+from captura import FrameGrabber, VideoFileReader
+from control_estado import CONTROL_FILE, ControlStateWatcher
+from detector import DrowsinessDetector
+from grabador import SessionRecorder
+from inferencia import INFERENCE_SIZE, MAX_FACES
+from instrumentacion import RollingStageTimer
+from ritmo import MAX_INFERENCE_FPS, MIN_INFERENCE_FPS, InferenceRateScheduler
+from servicio import CommandReader
+from telemetria import MetricsWriter
+
+QUEUE_SIZE = 1024  # Mensajes pendientes entre los procesos y el reenvio por stdout
+FORWARD_BATCH = 256  # Mensajes que se juntan en una sola escritura a stdout
+END_PUT_TIMEOUT = 1.0  # Segundos que un proceso espera para dejar su aviso de fin en la cola
+
+
+class StreamConfig(NamedTuple):
+    """Todo lo que necesita un proceso de deteccion; se envia por pickle al crearlo."""
+    stream_id: int
+    source: Union[int, str]  # Indice de camara o ruta de video
+    control_file: Path
+    cpu: Optional[int]  # Nucleo asignado, o None para que decida el sistema
+    inference_size: int
+    max_faces: int
+    min_inference_fps: float
+    max_inference_fps: float
+    flip: bool  # Reflejar tambien los videos; las camaras se reflejan siempre, como en angulo.py
+    alert_backend: str
+    alert_interval: float
+    metrics_format: Optional[str]
+    record_dir: Optional[Path]  # Carpeta de grabacion de esta fuente, o None
+
+
+class _QueueSink:
+    """Imita sys.stdout para MetricsWriter: cada flush() es un mensaje en la cola.
+
+    Si la cola esta llena (stdout o el panel no dan abasto) el mensaje se
+    descarta y se cuenta; la deteccion y las alertas nunca esperan al lector.
+    """
+
+    def __init__(self, sink: "mp.Queue", stream_id: int) -> None:
+        self._sink = sink
+        self._stream_id = stream_id
+        self._pending: list = []
+        self.dropped = 0
+
+    @property
+    def buffer(self) -> "_QueueSink":
+        return self
+
+    def write(self, data) -> None:
+        self._pending.append(data)
+
+    def flush(self) -> None:
+        if not self._pending:
+            return
+        first = self._pending[0]
+        payload = (b"" if isinstance(first, bytes) else "").join(self._pending)
+        self._pending.clear()
+        try:
+            self._sink.put_nowait((self._stream_id, payload))
+        except queue.Full:
+            self.dropped += 1
+
+
+def parse_source(text: str) -> Union[int, str]:
+    return int(text) if text.isdigit() else text
+
+
+def assign_cpus(count: int) -> List[Optional[int]]:
+    """Reparte las fuentes en los nucleos disponibles, en ronda si hay mas fuentes que nucleos."""
+    if not hasattr(os, "sched_getaffinity"):
+        return [None] * count
+    cpus = sorted(os.sched_getaffinity(0))
+    return [cpus[index % len(cpus)] for index in range(count)]
+
+
+def run_stream(config: StreamConfig, sink: "mp.Queue", stop_event) -> None:
+    """Bucle de deteccion de una fuente; corre en su propio proceso y sin ventana."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # El supervisor coordina el cierre
+    if config.cpu is not None:
+        os.sched_setaffinity(0, {config.cpu})
+    # Un hilo de OpenCV por proceso: el paralelismo lo dan los procesos
+    cv2.setNumThreads(1)
+
+    cap = source = alert_engine = recorder = queue_sink = None
+    parent = mp.parent_process()
+    camera = isinstance(config.source, int)
+    try:
+        if camera:
+            cap = open_camera(config.source)
+            if cap is None:
+                print(f"[ERROR] stream {config.stream_id}: no se pudo abrir la camara {config.source}",
+                      file=sys.stderr)
+                return
+            # Camara: siempre el frame mas nuevo, como en angulo.py
+            source = FrameGrabber(cap).start()
+        else:
+            cap = cv2.VideoCapture(config.source)
+            if not cap.isOpened():
+                print(f"[ERROR] stream {config.stream_id}: no se pudo abrir {config.source}", file=sys.stderr)
+                return
+            # Video: se procesan todos los frames, sin descartar
+            source = VideoFileReader(cap)
+
+        control_watcher = ControlStateWatcher(config.control_file)
+        queue_sink = _QueueSink(sink, config.stream_id)
+        metrics_writer = MetricsWriter(queue_sink, fmt=config.metrics_format, stream_id=config.stream_id)
+        alert_engine = AlertEngine(create_backend(config.alert_backend), min_interval=config.alert_interval).start()
+        if config.record_dir is not None:
+            recorder = SessionRecorder(config.record_dir, stream_id=config.stream_id).start()
+        timer = RollingStageTimer()
+        inference_rate = InferenceRateScheduler(config.min_inference_fps, config.max_inference_fps)
+
+        # Los frames no se muestran: el espejo de las camaras (y de los videos con --flip) va en los landmarks
+        with DrowsinessDetector(inference_size=config.inference_size, timer=timer,
+                                max_faces=config.max_faces, mirror=camera or config.flip) as detector:
+            loop = DetectionLoop(detector, source, control_watcher, metrics_writer, alert_engine,
+                                 inference_rate, timer, recorder, stream_id=config.stream_id)
+            while not stop_event.is_set() and loop.step():
+                timer.tick()
+                if not parent.is_alive():
+                    # El supervisor murio sin avisar (p. ej. kill desde el panel): se suelta la camara
+                    break
+    except Exception as exc:
+        print(f"[ERROR] stream {config.stream_id}: {exc}", file=sys.stderr)
+    finally:
+        if alert_engine is not None:
+            alert_engine.stop()
+        if recorder is not None:
+            recorder.stop()
+        if source is not None:
+            source.stop()  # Tambien libera la camara o el video
+        elif cap is not None:
+            cap.release()
+        if queue_sink is not None and queue_sink.dropped:
+            print(f"[WARN] stream {config.stream_id}: {queue_sink.dropped} mensajes de metricas descartados "
+                  f"con la cola llena", file=sys.stderr)
+        try:
+            sink.put((config.stream_id, None), timeout=END_PUT_TIMEOUT)  # Aviso de fin para el supervisor
+        except queue.Full:
+            pass
+        if not parent.is_alive():
+            sink.cancel_join_thread()  # Nadie va a leer la cola: no esperar a vaciarla al salir
+
+
+def forward(sink: "mp.Queue", workers: List[mp.Process], stream) -> None:
+    """Reenvia por stdout lo que mandan los procesos hasta que todos terminan."""
+    active = len(workers)
+    while active:
+        try:
+            messages = [sink.get(timeout=0.5)]
+        except queue.Empty:
+            if not any(worker.is_alive() for worker in workers):
+                break
+            continue
+        while len(messages) < FORWARD_BATCH:
+            try:
+                messages.append(sink.get_nowait())
+            except queue.Empty:
+                break
+        for stream_id, payload in messages:
+            if payload is None:
+                active -= 1
+            else:
+                # Todo va al buffer binario para no mezclar el orden entre texto y registros
+                stream.buffer.write(payload if isinstance(payload, bytes) else payload.encode())
+        stream.buffer.flush()
+
+
+def wait_for_quit(commands: CommandReader, stop_event) -> None:
+    """Detiene todas las fuentes con 'quit' (o stdin cerrado); start y pause no aplican aqui."""
+    while commands.wait() != "quit":
+        pass
+    stop_event.set()
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Supervisa varios detectores de somnolencia en paralelo.")
+    parser.add_argument("--source", action="append", required=True,
+                        help="Indice de camara o ruta de video; repetir por cada fuente")
+    parser.add_argument("--control", type=Path, action="append", default=None,
+                        help="Archivo de control de cada fuente, en el mismo orden; por defecto el compartido")
+    parser.add_argument("--inference-size", type=int, default=INFERENCE_SIZE)
+    parser.add_argument("--max-faces", type=int, default=MAX_FACES, help="Ocupantes a vigilar por fuente")
+    parser.add_argument("--min-inference-fps", type=float, default=MIN_INFERENCE_FPS,
+                        help="Inferencias por segundo con ojos abiertos y cabeza quieta; 0 infiere siempre")
+    parser.add_argument("--max-inference-fps", type=float, default=MAX_INFERENCE_FPS,
+                        help="Tope de inferencias por segundo cerca del umbral; 0 infiere cada frame")
+    parser.add_argument("--flip", action="store_true", help="Reflejar tambien los videos; las camaras siempre se reflejan, como en angulo.py")
+    parser.add_argument("--no-pin", action="store_true", help="No fijar cada proceso a un nucleo")
+    parser.add_argument("--metrics-format", choices=("binary", "json"), default=None)
+    parser.add_argument("--alert-backend", choices=("auto",) + tuple(BACKENDS), default="auto")
+    parser.add_argument("--alert-interval", type=float, default=ALERT_MIN_INTERVAL)
+    parser.add_argument("--record", type=Path, default=None,
+                        help="Grabar cada fuente en <carpeta>/stream_<id>")
+    parser.add_argument("--service", action="store_true",
+                        help="Terminar con 'quit' por stdin o al cerrarse stdin (lo usa el panel)")
+    args = parser.parse_args(argv)
+    if args.control and len(args.control) > len(args.source):
+        parser.error("hay mas --control que --source")
+    return args
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    controls = list(args.control or [])
+    controls += [CONTROL_FILE] * (len(args.source) - len(controls))
+    cpus = [None] * len(args.source) if args.no_pin else assign_cpus(len(args.source))
+    configs = [
+        StreamConfig(stream_id, parse_source(source), control, cpu, args.inference_size, args.max_faces,
+                     args.min_inference_fps, args.max_inference_fps, args.flip,
+                     args.alert_backend, args.alert_interval, args.metrics_format,
+                     args.record / f"stream_{stream_id}" if args.record else None)
+        for stream_id, (source, control, cpu) in enumerate(zip(args.source, controls, cpus))
+    ]
+
+    sink = mp.Queue(QUEUE_SIZE)
+    stop_event = mp.Event()
+    workers = [
+        mp.Process(target=run_stream, args=(config, sink, stop_event), name=f"stream-{config.stream_id}")
+        for config in configs
+    ]
+    # SIGTERM (QProcess.terminate en el panel) cierra los procesos igual que Ctrl+C
+    signal.signal(signal.SIGTERM, lambda *_: stop_event.set())
+    for worker in workers:
+        worker.start()
+    if args.service:
+        # Despues de crear los procesos: con fork, un hilo ya bloqueado leyendo stdin deja
+        # tomado el lock de sys.stdin en el hijo, que se cuelga al cerrarlo en su arranque
+        commands = CommandReader().start()
+        threading.Thread(target=wait_for_quit, args=(commands, stop_event), name="QuitWatcher",
+                         daemon=True).start()
+    for config in configs:
+        print(f"[INFO] stream {config.stream_id}: {config.source} (nucleo {config.cpu})", file=sys.stderr)
+
+    try:
+        forward(sink, workers, sys.stdout)
+    except KeyboardInterrupt:
+        stop_event.set()
+    finally:
+        stop_event.set()
+        for worker in workers:
+            worker.join(timeout=5.0)
+            if worker.is_alive():
+                worker.terminate()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,205 @@
+"""Canal de metricas entre angulo.py y el panel de control.
+
+Por defecto cada frame se emite como un registro binario de ancho fijo por
+stdout. El panel decodifica en bloque todo lo recibido en cada ``readyRead``
+con ``np.frombuffer``. Para depurar se puede volver a lineas JSON exportando
+``ANGULO_METRICS_FORMAT=json`` antes de lanzar el detector.
+"""
+import json
+import os
+import struct
+import sys
+from typing import List, Tuple
+
+import numpy as np
+
+from instrumentacion import EMPTY_STATS, StageStats
+from pose_cabeza import HEAD_STATE_CODES, HEAD_STATES
+
+METRICS_FORMAT_ENV = "ANGULO_METRICS_FORMAT"
+RECORD_MAGIC = b"\xa5\x5a"  # Bytes que no aparecen al inicio de texto UTF-8
+SCHEMA_VERSION = 6
+
+# Layout v6 (little endian, sin padding):
+# magic, version, eye_state, frame, closed_frames, ear_raw, ear_metric, ear_smoothed, ear_threshold,
+# fps, inference_ms, dropped_frames, stream_id, alert, face_id, inference_fps, pitch, head_state
+# fps, inference_ms, dropped_frames e inference_fps se actualizan cada STATS_INTERVAL segundos en el detector.
+# stream_id distingue las camaras cuando supervisor.py corre varios detectores a la vez.
+# Con varios ocupantes se emite un registro por rostro y frame; face_id es estable por ocupante.
+RECORD_STRUCT = struct.Struct("<2sBBII4f2fIBBHffB")
+RECORD_DTYPE = np.dtype([
+    ("magic", "S2"),
+    ("version", "u1"),
+    ("eye_state", "u1"),
+    ("frame", "<u4"),
+    ("closed_frames", "<u4"),
+    ("ear_raw", "<f4"),
+    ("ear_metric", "<f4"),
+    ("ear_smoothed", "<f4"),
+    ("ear_threshold", "<f4"),
+    ("fps", "<f4"),
+    ("inference_ms", "<f4"),
+    ("dropped_frames", "<u4"),
+    ("stream_id", "u1"),
+    ("alert", "u1"),
+    ("face_id", "<u2"),
+    ("inference_fps", "<f4"),
+    ("pitch", "<f4"),
+    ("head_state", "u1"),
+])
+RECORD_SIZE = RECORD_STRUCT.size
+assert RECORD_DTYPE.itemsize == RECORD_SIZE
+
+EYE_STATES = ("calibrando", "abiertos", "cerrados")
+EYE_STATE_CODES = {name: code for code, name in enumerate(EYE_STATES)}
+
+
+def pack_record(frame: int, ear_raw: float, ear_metric: float, ear_smoothed: float,
+                ear_threshold: float, eye_state: str, closed_frames: int,
+                stats: StageStats = EMPTY_STATS, alert: bool = False, face_id: int = 0,
+                pitch: float = float("nan"), head_state: str = HEAD_STATES[0], stream_id: int = 0) -> bytes:
+    """Empaqueta un registro binario; lo usan el canal por stdout y el grabador de sesiones."""
+    return RECORD_STRUCT.pack(
+        RECORD_MAGIC,
+        SCHEMA_VERSION,
+        EYE_STATE_CODES.get(eye_state, 0),
+        frame,
+        closed_frames,
+        ear_raw,
+        ear_metric,
+        ear_smoothed,
+        ear_threshold,
+        stats.fps,
+        stats.inference_ms,
+        stats.dropped_frames,
+        stream_id,
+        bool(alert),
+        face_id & 0xFFFF,
+        stats.inference_fps,
+        pitch,
+        HEAD_STATE_CODES.get(head_state, 0),
+    )
+
+
+class MetricsWriter:
+    """Emite las metricas de cada frame en binario o, si se pide, en JSON."""
+
+    def __init__(self, stream=None, fmt: str = None, stream_id: int = 0) -> None:
+        self.fmt = (fmt or os.environ.get(METRICS_FORMAT_ENV, "binary")).lower()
+        self.stream = stream if stream is not None else sys.stdout
+        self.stream_id = int(stream_id)
+
+    def write(self, frame: int, ear_raw: float, ear_metric: float, ear_smoothed: float,
+              ear_threshold: float, eye_state: str, closed_frames: int,
+              stats: StageStats = EMPTY_STATS, alert: bool = False, face_id: int = 0,
+              pitch: float = float("nan"), head_state: str = HEAD_STATES[0]) -> None:
+        if self.fmt == "json":
+            metrics_payload = {
+                "stream_id": self.stream_id,
+                "face_id": face_id,
+                "frame": frame,
+                "ear_raw": float(ear_raw),
+                "ear_metric": float(ear_metric),
+                "ear_smoothed": float(ear_smoothed),
+                "ear_threshold": float(ear_threshold),
+                "eye_state": eye_state,
+                "closed_frames": int(closed_frames),
+                "alert": bool(alert),
+                "pitch": float(pitch),
+                "head_state": head_state,
+                "fps": stats.fps,
+                "inference_ms": stats.inference_ms,
+                "dropped_frames": stats.dropped_frames,
+                "inference_fps": stats.inference_fps,
+                "stages_ms": stats.stages,
+            }
+            print(json.dumps(metrics_payload), file=self.stream, flush=True)
+            return
+        buffer = self.stream.buffer
+        buffer.write(pack_record(
+            frame, ear_raw, ear_metric, ear_smoothed, ear_threshold, eye_state, closed_frames,
+            stats, alert, face_id, pitch, head_state, self.stream_id,
+        ))
+        buffer.flush()
+
+
+class MetricsDecoder:
+    """Separa registros binarios y lineas de texto de un flujo de bytes.
+
+    ``feed()`` acepta bloques de cualquier tamaño y devuelve todos los
+    registros completos como un arreglo estructurado, junto con las lineas de
+    texto (logs o JSON de depuracion) que se intercalaron en el flujo.
+    """
+
+    def __init__(self) -> None:
+        self._buffer = bytearray()
+        self.rejected_bytes = 0  # Bytes descartados por encabezados invalidos
+
+    def reset(self) -> None:
+        self._buffer.clear()
+
+    def feed(self, data: bytes) -> Tuple[np.ndarray, List[str]]:
+        buf = self._buffer
+        buf += data
+        chunks: List[np.ndarray] = []
+        lines: List[str] = []
+        pos = 0
+        size = len(buf)
+        while pos < size:
+            start = buf.find(RECORD_MAGIC, pos)
+            if start != pos:
+                end = start if start >= 0 else size
+                if start < 0:
+                    # Solo se entregan lineas completas; un byte de magic partido queda en el buffer
+                    newline = buf.rfind(b"\n", pos, end)
+                    if newline < 0:
+                        break
+                    end = newline + 1
+                lines.extend(bytes(buf[pos:end]).decode(errors="replace").splitlines())
+                pos = end
+                continue
+
+            count = (size - pos) // RECORD_SIZE
+            if count == 0:
+                break
+            records = np.frombuffer(buf[pos:pos + count * RECORD_SIZE], dtype=RECORD_DTYPE)
+            valid = (records["magic"] == RECORD_MAGIC) & (records["version"] == SCHEMA_VERSION)
+            good = count if valid.all() else int(np.argmin(valid))
+            if good == 0:
+                # Magic falso o version desconocida: se avanza un byte y se resincroniza
+                self.rejected_bytes += 1
+                pos += 1
+                continue
+            chunks.append(records[:good])
+            pos += good * RECORD_SIZE
+        del buf[:pos]
+
+        if not chunks:
+            return np.empty(0, dtype=RECORD_DTYPE), lines
+        if len(chunks) == 1:
+            return chunks[0], lines
+        return np.concatenate(chunks), lines
+
+
+def record_to_dict(record) -> dict:
+    """Convierte un registro binario al mismo diccionario que emite el modo JSON."""
+    code = int(record["eye_state"])
+    head_code = int(record["head_state"])
+    return {
+        "stream_id": int(record["stream_id"]),
+        "face_id": int(record["face_id"]),
+        "frame": int(record["frame"]),
+        "ear_raw": float(record["ear_raw"]),
+        "ear_metric": float(record["ear_metric"]),
+        "ear_smoothed": float(record["ear_smoothed"]),
+        "ear_threshold": float(record["ear_threshold"]),
+        "eye_state": EYE_STATES[code] if code < len(EYE_STATES) else None,
+        "closed_frames": int(record["closed_frames"]),
+        "alert": bool(record["alert"]),
+        "pitch": float(record["pitch"]),
+        "head_state": HEAD_STATES[head_code] if head_code < len(HEAD_STATES) else None,
+        "fps": float(record["fps"]),
+        "inference_ms": float(record["inference_ms"]),
+        "dropped_frames": int(record["dropped_frames"]),
+        "inference_fps": float(record["inference_fps"]),
+    }
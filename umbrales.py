@@ -0,0 +1,16 @@
+"""Constantes del umbral dinamico de EAR.
+
+Viven aparte de detector.py para que barrido.py pueda repetir la misma
+logica sobre sesiones grabadas sin importar MediaPipe.
+"""
+
+EAR_THRESH = 0.26  # Umbral base para la relacion de aspecto del ojo
+FRAME_THRESHOLD = 50  # Numero de frames para considerar que el ojo esta cerrado
+EAR_SMOOTHING_WINDOW = 3  # Ventana corta para suavizar el EAR sin retraso
+CALIBRATION_FRAMES = 30  # Frames iniciales para calibrar el EAR abierto
+BASELINE_WINDOW_FRAMES = 3600  # Historial de EAR abierto para la mediana de la linea base (~1 min a 60 FPS)
+EAR_DYNAMIC_RATIO = 0.85  # Factor para generar umbral dinamico desde la linea base
+MIN_DYNAMIC_EAR = 0.18  # Limite inferior para el umbral dinamico
+EAR_BASELINE_ALPHA = 0.06  # Peso para actualizar la linea base del EAR
+EAR_BASELINE_GUARD_RATIO = 0.85  # Evita que la linea base caiga con ojos cerrados
+EAR_MIN_MARGIN = 0.015  # Diferencia minima entre la linea base y el umbral